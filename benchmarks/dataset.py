@@ -0,0 +1,24 @@
+from datetime import date
+from benchmarks.synthetic_data import SyntheticDataGenerator, load_postgres
+
+
+SCHEMA = "benchmark"
+
+STATEMENT_DATE = date(2023, 6, 30)
+PREVIOUS_DATE = date(2023, 6, 29)
+
+
+def load(pool, size, seed=0):
+    """
+    Recreate the benchmark schema with size positions on STATEMENT_DATE and PREVIOUS_DATE.
+    Returns the FIGI tickers by ISIN that the fake OpenFIGI client should know.
+    """
+    generator = SyntheticDataGenerator(
+        seed=seed,
+        start_date=PREVIOUS_DATE,
+        end_date=STATEMENT_DATE,
+        positions=size,
+        securities=max(1000, size // 5),
+    )
+    load_postgres(pool, generator, SCHEMA)
+    return generator.figi_tickers()
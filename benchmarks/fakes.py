@@ -0,0 +1,70 @@
+import pandas as pd
+
+
+class VendorCallCounter:
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.calls = 0
+        self.items = 0
+
+    def record(self, items):
+        self.calls += 1
+        self.items += len(items)
+
+
+class FakeOpenFigiAPI:
+    """
+    Maps the ISINs found in tickers_by_isin; every other ISIN is a miss.
+    """
+
+    def __init__(self, counter, tickers_by_isin):
+        self.counter = counter
+        self.tickers_by_isin = tickers_by_isin
+
+    def map_isins(self, isins):
+        self.counter.record(isins)
+        isins = list(dict.fromkeys(isins))
+        mapped = [{"isin": isin, "ticker": self.tickers_by_isin[isin], "exchCode": "US"} for isin in isins if isin in self.tickers_by_isin]
+        failed = [{"ISIN": isin, "Reason": "No identifier found."} for isin in isins if isin not in self.tickers_by_isin]
+        return pd.DataFrame(mapped), pd.DataFrame(failed, columns=["ISIN", "Reason"])
+
+
+class FakeEodhAPI:
+
+    def __init__(self, counter):
+        self.counter = counter
+
+    def get_info_multiple_tickers(self, stock_tickers):
+        self.counter.record(stock_tickers)
+        return [{"Code": ticker.split(".")[0], "Currency": "USD", "Exchange": "US"} for ticker in stock_tickers[::2]]
+
+
+class FakeYFinanceAPI:
+
+    def __init__(self, counter):
+        self.counter = counter
+
+    def get_data_multiple_tickers_parallel(self, tickers, **kwargs):
+        self.counter.record(tickers)
+        found = [{"ISIN": None, "Ticker": ticker, "Currency": "USD"} for ticker in tickers[::3]]
+        return pd.DataFrame(found, columns=["ISIN", "Ticker", "Currency"]), pd.DataFrame(columns=["Ticker", "Reason"])
+
+
+class FakeMarketDBApi:
+
+    def __init__(self, counter):
+        self.counter = counter
+
+    def register_tickers(self, symbol_list):
+        self.counter.record(symbol_list)
+        return {"created": list(symbol_list), "existing": [], "failed": []}
+
+
+def fake_api_clients(counter, tickers_by_isin):
+    """
+    Return local stand-ins for the (OpenFIGI, EODH, YFinance, MarketDB) clients sharing one counter.
+    """
+    return FakeOpenFigiAPI(counter, tickers_by_isin), FakeEodhAPI(counter), FakeYFinanceAPI(counter), FakeMarketDBApi(counter)
@@ -0,0 +1,90 @@
+from contextlib import contextmanager
+
+
+# Statements sent to prepare a query or to guard it inside a transaction, counted apart
+# from the queries themselves.
+OVERHEAD_PREFIXES = ("PREPARE", "SAVEPOINT", "RELEASE SAVEPOINT", "ROLLBACK TO SAVEPOINT")
+
+
+class QueryCounter:
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.queries = 0
+        self.overhead = 0
+        self.rows = 0
+
+
+class CountingCursor:
+
+    def __init__(self, cursor, counter):
+        self._cursor = cursor
+        self._counter = counter
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self._cursor.close()
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        for row in self._cursor:
+            self._counter.rows += 1
+            yield row
+
+    def execute(self, query, params=None):
+        if isinstance(query, str) and query.lstrip().upper().startswith(OVERHEAD_PREFIXES):
+            self._counter.overhead += 1
+        else:
+            self._counter.queries += 1
+        return self._cursor.execute(query, params)
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is not None:
+            self._counter.rows += 1
+        return row
+
+    def fetchmany(self, size=None):
+        rows = self._cursor.fetchmany(size) if size is not None else self._cursor.fetchmany()
+        self._counter.rows += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        self._counter.rows += len(rows)
+        return rows
+
+
+class CountingConnection:
+
+    def __init__(self, conn, counter):
+        self._conn = conn
+        self._counter = counter
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def cursor(self, *args, **kwargs):
+        return CountingCursor(self._conn.cursor(*args, **kwargs), self._counter)
+
+
+class CountingPool:
+    """
+    Wraps a DatabasePool so every statement sent and every row fetched is counted.
+    PREPARE and SAVEPOINT statements are counted in overhead rather than in queries.
+    """
+
+    def __init__(self, pool):
+        self._pool = pool
+        self.counter = QueryCounter()
+
+    @contextmanager
+    def connection(self):
+        with self._pool.connection() as conn:
+            yield CountingConnection(conn, self.counter)
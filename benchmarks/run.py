@@ -0,0 +1,192 @@
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+import tracemalloc
+from datetime import datetime
+from dotenv import load_dotenv
+from benchmarks import dataset
+from benchmarks.fakes import VendorCallCounter, fake_api_clients
+from benchmarks.instrumentation import CountingPool
+from database.database_connector import env_db_config, get_pool
+from migrations.runner import MigrationRunner
+from repository.tables.daily_rollups import DailyRollups
+from repository.tables.eod_prices import EodPrices
+from repository.tables.position_history import PositionHistory
+from repository.tables.position_statements import PositionStatements
+from repository.tables.ticker_mappings import TickerMappings
+from services.asset_class_analyzer import AssetClassAnalyzer
+from services.position_history_analyzer import PositionHistoryAnalyzer
+from services.position_statement_analyzer import PositionStatementAnalyzer
+from utils.symbology import reset_resolver
+
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+DEFAULT_SIZES = [10000, 100000, 1000000]
+
+JSON_TYPES = {
+    "Equity & Equivalent": "Equity & Stocks",
+    "Bonds & Equivalent": "Bonds & Notes",
+    "Cash & Equivalent": "Cash & Deposits",
+    "Derivatives & Equivalent": "Derivatives & Options",
+    "Private Assets": "Hedge Funds & Others",
+}
+
+
+def net_worth_json(position_statements):
+    """
+    Build a Net Worth report that matches the position statement totals of the benchmark date.
+    """
+    records = position_statements.get_asset_class_records(dataset.STATEMENT_DATE)
+    data = [{"Type": JSON_TYPES[asset_class], "Total": f"{float(total):,.2f}"} for asset_class, total in records if asset_class in JSON_TYPES]
+    return {"Table Name": "Net Worth", "Data": data}
+
+
+def scenarios(pool, api_clients, json_data):
+    """
+    Return (name, callable) pairs that run each analyzer end to end on pool.
+    """
+    statement_date = dataset.STATEMENT_DATE
+    previous_date = dataset.PREVIOUS_DATE
+    position_statements = PositionStatements(pool)
+    eod_prices = EodPrices(pool)
+    position_history = PositionHistory(pool)
+
+    statement_analyzer = PositionStatementAnalyzer(position_statements, eod_prices, TickerMappings(pool), api_clients=api_clients)
+    history_analyzer = PositionHistoryAnalyzer(position_history)
+    asset_class_analyzer = AssetClassAnalyzer(position_statements)
+    return [
+        ("position_statement", lambda: statement_analyzer.analyze(statement_date, "All", "All", "All", 5)),
+        ("position_history", lambda: history_analyzer.analyze(statement_date, "Equity & Equivalent", 1)),
+        ("position_history_range", lambda: history_analyzer.analyze_range(previous_date, statement_date, "Equity & Equivalent", 1)),
+        ("asset_class", lambda: asset_class_analyzer.analyze(json_data, statement_date)),
+    ]
+
+
+def measure(run, counting_pool, vendor_counter, repeat):
+    """
+    Time run repeat times, then run it once more under tracemalloc for peak memory.
+    Query, row and vendor counts are taken from the last timed run; PREPARE and SAVEPOINT
+    statements are reported as overhead_statements, not as queries.
+    """
+    wall_times = []
+    for _ in range(repeat):
+        counting_pool.counter.reset()
+        vendor_counter.reset()
+        started = time.perf_counter()
+        run()
+        wall_times.append(time.perf_counter() - started)
+    queries, overhead, rows = counting_pool.counter.queries, counting_pool.counter.overhead, counting_pool.counter.rows
+    vendor_calls, vendor_items = vendor_counter.calls, vendor_counter.items
+
+    tracemalloc.start()
+    run()
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "wall_seconds": min(wall_times),
+        "queries": queries,
+        "overhead_statements": overhead,
+        "rows_fetched": rows,
+        "peak_memory_bytes": peak_memory,
+        "vendor_calls": vendor_calls,
+        "vendor_items": vendor_items,
+    }
+
+
+def run_benchmarks(sizes, repeat, seed):
+    """
+    Load each dataset size into the benchmark schema and measure every analyzer on it.
+    """
+    db_config = {**env_db_config(), "options": f"-c search_path={dataset.SCHEMA}"}
+    pool = get_pool(db_config)
+
+    results = []
+    for size in sizes:
+        print(f"Loading {size} positions...")
+        tickers_by_isin = dataset.load(pool, size, seed)
+        MigrationRunner(pool).upgrade()
+        DailyRollups(pool).refresh_pending()
+
+        counting_pool = CountingPool(pool)
+        vendor_counter = VendorCallCounter()
+        api_clients = fake_api_clients(vendor_counter, tickers_by_isin)
+        json_data = net_worth_json(PositionStatements(counting_pool))
+
+        for name, run in scenarios(counting_pool, api_clients, json_data):
+            # The resolver and its mappings are process-wide; reload them for every scenario
+            # so no scenario runs on the mappings of another dataset size.
+            reset_resolver()
+            metrics = measure(run, counting_pool, vendor_counter, repeat)
+            results.append({"scenario": name, "size": size, **metrics})
+            print(f"  {name:<24} {metrics['wall_seconds']:>9.3f}s {metrics['queries']:>6} queries "
+                  f"{metrics['rows_fetched']:>9} rows {metrics['peak_memory_bytes'] / 2**20:>8.1f} MiB "
+                  f"{metrics['vendor_calls']:>4} vendor calls")
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(base_path, new_path):
+    """
+    Print the ratio new / base of every metric for the scenarios both files contain.
+    """
+    with open(base_path) as file:
+        base = {(row["scenario"], row["size"]): row for row in json.load(file)["results"]}
+    with open(new_path) as file:
+        new = {(row["scenario"], row["size"]): row for row in json.load(file)["results"]}
+
+    metrics = ["wall_seconds", "queries", "rows_fetched", "peak_memory_bytes", "vendor_calls"]
+    print(f"{'scenario':<24} {'size':>8} " + " ".join(f"{metric:>18}" for metric in metrics))
+    for key in sorted(base.keys() & new.keys()):
+        ratios = []
+        for metric in metrics:
+            before, after = base[key][metric], new[key][metric]
+            ratios.append(f"{after / before:>17.2f}x" if before else f"{'n/a':>18}")
+        print(f"{key[0]:<24} {key[1]:>8} " + " ".join(ratios))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.run",
+        description="Benchmark the analyzers against a local Postgres (DB_* variables). The 'benchmark' schema is dropped and recreated.",
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Numbers of positions to load.")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per scenario; the fastest is reported.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Results file (default: benchmarks/results/<timestamp>.json).")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "NEW"), help="Compare two results files instead of running.")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    load_dotenv()
+    started_at = datetime.now()
+    results = run_benchmarks(args.sizes, args.repeat, args.seed)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{started_at:%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as file:
+        json.dump({
+            "started_at": started_at.isoformat(),
+            "git_commit": git_commit(),
+            "python": sys.version.split()[0],
+            "sizes": args.sizes,
+            "results": results,
+        }, file, indent=2)
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import os
+import sys
+import json
+import glob
+import argparse
+import subprocess
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in a fresh interpreter per page: loads the page without running its __main__ block,
+# then calls main() once. Outside 'streamlit run' the st.* calls render nothing, so the
+# second phase measures the work a first render does (connections, queries, imports).
+PROBE = """
+import sys, json, time, runpy
+started = time.perf_counter()
+modules = len(sys.modules)
+error = None
+try:
+    namespace = runpy.run_path(sys.argv[1], run_name="startup_probe")
+except Exception as e:
+    namespace, error = {}, f"import: {e!r}"
+imported = time.perf_counter()
+imported_modules = len(sys.modules)
+if error is None and sys.argv[2] == "render" and "main" in namespace:
+    try:
+        namespace["main"]()
+    except Exception as e:
+        error = f"render: {e!r}"
+rendered = time.perf_counter()
+print(json.dumps({
+    "import_seconds": imported - started,
+    "render_seconds": rendered - imported,
+    "modules_imported": imported_modules - modules,
+    "modules_rendered": len(sys.modules) - imported_modules,
+    "error": error,
+}))
+"""
+
+
+def pages():
+    return [os.path.join(ROOT, "Home_Page.py")] + sorted(glob.glob(os.path.join(ROOT, "pages", "*.py")))
+
+
+def slowest_imports(stderr, top):
+    """
+    Return the top (cumulative microseconds, module) entries of a -X importtime log.
+    """
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        entries.append((int(cumulative), name.strip()))
+    return sorted(entries, reverse=True)[:top]
+
+
+def probe(page, render, top):
+    """
+    Measure one page in a fresh interpreter and return its timings.
+    """
+    command = [sys.executable, "-X", "importtime", "-c", PROBE, page, "render" if render else "import"]
+    completed = subprocess.run(command, cwd=ROOT, capture_output=True, text=True)
+    lines = completed.stdout.strip().splitlines()
+    if completed.returncode != 0 or not lines:
+        return {"page": os.path.relpath(page, ROOT), "error": completed.stderr.strip().splitlines()[-1:] or "probe failed"}
+    report = json.loads(lines[-1])
+    report["page"] = os.path.relpath(page, ROOT)
+    report["slowest_imports"] = slowest_imports(completed.stderr, top)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.startup_report",
+        description="Report the cold import and first-render cost of every Streamlit page, each in a fresh interpreter.",
+    )
+    parser.add_argument("--no-render", action="store_true", help="Only measure imports; do not call main().")
+    parser.add_argument("--top", type=int, default=5, help="Slowest imported modules listed per page.")
+    parser.add_argument("--output", help="Also write the report as JSON to this file.")
+    args = parser.parse_args()
+
+    reports = [probe(page, not args.no_render, args.top) for page in pages()]
+    for report in reports:
+        if "import_seconds" not in report:
+            print(f"{report['page']:<32} failed: {report['error']}")
+            continue
+        print(f"{report['page']:<32} import {report['import_seconds']:>7.3f}s ({report['modules_imported']} modules)"
+              f"  render {report['render_seconds']:>7.3f}s ({report['modules_rendered']} modules)")
+        for microseconds, name in report["slowest_imports"]:
+            print(f"{'':<34}{microseconds / 1e6:>7.3f}s  {name}")
+        if report["error"]:
+            print(f"{'':<34}{report['error']}")
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(reports, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+import io
+import os
+import csv
+import math
+import random
+import argparse
+import pandas as pd
+from datetime import date, timedelta
+from utils.mapping import ticker_mapping
+from utils.symbology import TickerResolver
+
+
+TABLES = """
+DROP SCHEMA IF EXISTS {schema} CASCADE;
+CREATE SCHEMA {schema};
+CREATE TABLE {schema}.position_statements (
+    statement_date DATE, asset_class TEXT, client_name TEXT, custodian_name TEXT,
+    security_id TEXT, isin TEXT, ccy TEXT, mtm_price NUMERIC, mtm_rpt_ccy NUMERIC
+);
+CREATE TABLE {schema}.position_history (
+    report_date DATE, asset_class TEXT, security_id TEXT,
+    position_qty NUMERIC, mtm_price NUMERIC, mtm_rpt_ccy NUMERIC
+);
+CREATE TABLE {schema}.eod_prices (reporting_date DATE, ticker_id TEXT, close NUMERIC);
+CREATE TABLE {schema}.ticker_mapping (security_id TEXT, ticker_id TEXT);
+"""
+
+COLUMNS = {
+    "position_statements": ["statement_date", "asset_class", "client_name", "custodian_name", "security_id", "isin", "ccy", "mtm_price", "mtm_rpt_ccy"],
+    "position_history": ["report_date", "asset_class", "security_id", "position_qty", "mtm_price", "mtm_rpt_ccy"],
+    "eod_prices": ["reporting_date", "ticker_id", "close"],
+    "ticker_mapping": ["security_id", "ticker_id"],
+}
+
+ASSET_CLASSES = ["Equity & Equivalent", "Bonds & Equivalent", "Cash & Equivalent", "Derivatives & Equivalent", "Private Assets"]
+ASSET_CLASS_WEIGHTS = [0.55, 0.25, 0.08, 0.07, 0.05]
+
+# Reporting-currency rate of each position currency
+FX_RATES = {"USD": 1.0, "EUR": 1.08, "GBP": 1.27, "JPY": 0.0068, "SGD": 0.74, "HKD": 0.128, "CHF": 1.11}
+
+EXCHANGES = [("US", "USD"), ("JP", "JPY"), ("SG", "SGD"), ("HK", "HKD"), ("GB", "GBP"), ("DE", "EUR"), ("SW", "CHF")]
+
+# Custodian security id formats and their share of generated securities.
+# "clean" ids already match eod_prices; "space", "dash" and "underscore" ids are fixed by the
+# separator rule; "mapped" ids need a ticker_mapping row; "isin" ids are ISIN-only and have no price.
+SECURITY_ID_FORMATS = [("clean", 0.55), ("space", 0.15), ("dash", 0.10), ("underscore", 0.04), ("mapped", 0.08), ("isin", 0.08)]
+
+
+class Security:
+
+    def __init__(self, security_id, isin, ccy, asset_class, ticker_id, base_price):
+        self.security_id = security_id
+        self.isin = isin
+        self.ccy = ccy
+        self.asset_class = asset_class
+        self.ticker_id = ticker_id
+        self.base_price = base_price
+
+
+class SyntheticDataGenerator:
+    """
+    Seeded, deterministic rows for position_statements, position_history, eod_prices and
+    ticker_mapping. Every business day between start_date and end_date holds the same
+    book of positions per (client, custodian), with prices following a random walk.
+    Rows are produced one date at a time, so years of history stream in bounded memory.
+    """
+
+    # Share of securities reported without an ISIN ("0"), which the statement check ignores
+    NO_ISIN_SHARE = 0.02
+    # Prices are a function of the day itself, so overlapping date windows agree
+    PRICE_EPOCH = date(2000, 1, 3)
+
+    def __init__(self, seed=0, start_date=date(2023, 1, 2), end_date=date(2023, 6, 30), positions=100000,
+                 securities=20000, clients=300, custodians=25, missing_price_share=0.05, mispriced_share=0.02,
+                 quantity_change_share=0.1):
+        self.seed = seed
+        self.start_date = start_date
+        self.end_date = end_date
+        self.missing_price_share = missing_price_share
+        self.mispriced_share = mispriced_share
+        self.quantity_change_share = quantity_change_share
+
+        rng = random.Random(seed)
+        self.clients = [f"Client {index:04d}" for index in range(clients)]
+        self.custodians = [f"Custodian {index:02d}" for index in range(custodians)]
+        self.mappings = {}
+        self.securities = self._securities(rng, securities)
+
+        # Each position is (client, custodian, security index, quantity)
+        self.positions = [
+            (rng.choice(self.clients), rng.choice(self.custodians), rng.randrange(len(self.securities)), rng.randint(1, 10000))
+            for _ in range(positions)
+        ]
+
+        unresolved = [security for security in self.securities if security.ticker_id is None]
+        resolver = TickerResolver({**ticker_mapping, **self.mappings})
+        ticker_ids = resolver.resolve(pd.Series([security.security_id for security in unresolved]))
+        for security, ticker_id in zip(unresolved, ticker_ids):
+            security.ticker_id = ticker_id
+
+    def _securities(self, rng, count):
+        securities = []
+        # The custodian ids of utils.mapping come first so the static mapping paths are exercised
+        for security_id in list(ticker_mapping)[:count]:
+            isin = self._isin(rng, "XS", len(securities))
+            securities.append(Security(security_id, isin, "USD", rng.choices(ASSET_CLASSES, ASSET_CLASS_WEIGHTS)[0], None, rng.uniform(5, 500)))
+
+        formats = [name for name, _ in SECURITY_ID_FORMATS]
+        weights = [share for _, share in SECURITY_ID_FORMATS]
+        while len(securities) < count:
+            index = len(securities)
+            exchange, ccy = rng.choice(EXCHANGES)
+            code = f"{rng.choice('ABCDEFGHKLMNPRSTVWXZ')}{index:05d}"
+            id_format = rng.choices(formats, weights)[0]
+            isin = self._isin(rng, exchange, index)
+            if id_format != "isin" and rng.random() < self.NO_ISIN_SHARE:
+                isin = "0"
+            ticker_id = None
+            if id_format == "clean":
+                security_id = f"{code}.{exchange}"
+            elif id_format == "space":
+                security_id = f"{code} {exchange}"
+            elif id_format == "dash":
+                security_id = f"{code}-{exchange}"
+            elif id_format == "underscore":
+                security_id = f"{code}_{exchange}"
+            elif id_format == "mapped":
+                security_id = f"{code} {exchange}T"
+                self.mappings[security_id] = f"{code}.{exchange}X"
+            else:
+                security_id = isin
+                ticker_id = ""
+            securities.append(Security(security_id, isin, ccy, rng.choices(ASSET_CLASSES, ASSET_CLASS_WEIGHTS)[0], ticker_id, rng.uniform(1, 1000)))
+        return securities
+
+    @staticmethod
+    def _isin(rng, country, index):
+        return f"{country}{index:07d}{rng.randrange(1000):03d}"
+
+    def business_days(self):
+        day = self.start_date
+        while day <= self.end_date:
+            if day.weekday() < 5:
+                yield day
+            day += timedelta(days=1)
+
+    def _date_rng(self, day):
+        return random.Random(self.seed * 1000003 + day.toordinal())
+
+    def prices(self, day):
+        """
+        Return the close of every security on day, a deterministic function of the day.
+        """
+        drift = (day - self.PRICE_EPOCH).days
+        return [
+            round(security.base_price * math.exp(0.00005 * drift + 0.02 * math.sin(index + drift / 7)), 4)
+            for index, security in enumerate(self.securities)
+        ]
+
+    def rows(self, day):
+        """
+        Return the (position_statements, position_history, eod_prices) rows of one day.
+        """
+        rng = self._date_rng(day)
+        closes = self.prices(day)
+
+        statements, history, eod_prices = [], [], []
+        for index, security in enumerate(self.securities):
+            if security.ticker_id and rng.random() >= self.missing_price_share:
+                eod_prices.append((day, security.ticker_id, closes[index]))
+
+        for client_name, custodian_name, security_index, quantity in self.positions:
+            security = self.securities[security_index]
+            mtm_price = closes[security_index]
+            if rng.random() < self.quantity_change_share:
+                quantity = max(1, round(quantity * rng.choice([0.5, 0.8, 1.25, 2.0])))
+            if rng.random() < self.mispriced_share:
+                mtm_price = round(mtm_price * rng.choice([0.85, 0.9, 1.1, 1.15]), 4)
+            mtm_rpt_ccy = round(quantity * mtm_price * FX_RATES[security.ccy], 4)
+            statements.append((day, security.asset_class, client_name, custodian_name, security.security_id,
+                               security.isin, security.ccy, mtm_price, mtm_rpt_ccy))
+            history.append((day, security.asset_class, security.security_id, quantity, mtm_price, mtm_rpt_ccy))
+        return statements, history, eod_prices
+
+    def ticker_mapping_rows(self):
+        return list(self.mappings.items())
+
+    def figi_tickers(self):
+        """
+        Return the FIGI ticker of the ISIN-only securities that a vendor can resolve (every other one).
+        """
+        isin_only = [security for security in self.securities if security.security_id == security.isin]
+        return {security.isin: security.security_id for security in isin_only[::2]}
+
+
+def copy_rows(conn, table, columns, rows):
+    """
+    Bulk-load rows into table with COPY.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows(["\\N" if value is None else value for value in row] for row in rows)
+    buffer.seek(0)
+    with conn.cursor() as cursor:
+        cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buffer)
+
+
+def load_postgres(pool, generator, schema):
+    """
+    Recreate schema and bulk-load the generated rows, one COPY per table per day.
+    """
+    with pool.connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(TABLES.format(schema=schema))
+        copy_rows(conn, f"{schema}.ticker_mapping", COLUMNS["ticker_mapping"], generator.ticker_mapping_rows())
+        conn.commit()
+
+        for day in generator.business_days():
+            statements, history, eod_prices = generator.rows(day)
+            copy_rows(conn, f"{schema}.position_statements", COLUMNS["position_statements"], statements)
+            copy_rows(conn, f"{schema}.position_history", COLUMNS["position_history"], history)
+            copy_rows(conn, f"{schema}.eod_prices", COLUMNS["eod_prices"], eod_prices)
+            conn.commit()
+
+        with conn.cursor() as cursor:
+            for table in COLUMNS:
+                cursor.execute(f"ANALYZE {schema}.{table}")
+        conn.commit()
+
+
+def write_csv(generator, directory):
+    """
+    Write one CSV file per table into directory, as a file-backed stand-in for the database.
+    """
+    os.makedirs(directory, exist_ok=True)
+    files = {table: open(os.path.join(directory, f"{table}.csv"), "w", newline="") for table in COLUMNS}
+    try:
+        writers = {table: csv.writer(file) for table, file in files.items()}
+        for table, writer in writers.items():
+            writer.writerow(COLUMNS[table])
+        writers["ticker_mapping"].writerows(generator.ticker_mapping_rows())
+        for day in generator.business_days():
+            statements, history, eod_prices = generator.rows(day)
+            writers["position_statements"].writerows(statements)
+            writers["position_history"].writerows(history)
+            writers["eod_prices"].writerows(eod_prices)
+    finally:
+        for file in files.values():
+            file.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.synthetic_data", description="Generate synthetic position data.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--start", type=date.fromisoformat, default=date(2021, 1, 4))
+    parser.add_argument("--end", type=date.fromisoformat, default=date(2023, 12, 29))
+    parser.add_argument("--positions", type=int, default=100000, help="Positions held on every business day.")
+    parser.add_argument("--securities", type=int, default=20000)
+    parser.add_argument("--clients", type=int, default=300)
+    parser.add_argument("--custodians", type=int, default=25)
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--csv", metavar="DIRECTORY", help="Write CSV files into DIRECTORY.")
+    target.add_argument("--schema", help="Load into this schema of the DB_* Postgres; it is dropped and recreated.")
+    args = parser.parse_args()
+
+    generator = SyntheticDataGenerator(args.seed, args.start, args.end, args.positions, args.securities, args.clients, args.custodians)
+    if args.csv:
+        write_csv(generator, args.csv)
+    else:
+        from dotenv import load_dotenv
+        from database.database_connector import env_db_config, get_pool
+        load_dotenv()
+        load_postgres(get_pool(env_db_config()), generator, args.schema)
+
+
+if __name__ == "__main__":
+    main()
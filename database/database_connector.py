@@ -1,4 +1,9 @@
+import os
+import threading
+from contextlib import contextmanager
 import psycopg2
+import psycopg2.extensions
+import psycopg2.pool
 
 
 class DatabaseConnector:
@@ -28,6 +33,18 @@ class DatabaseConnector:
         except psycopg2.DatabaseError as database_error:
             raise Exception(f"Unable to connect to the database. Error: {database_error}")
 
+    def pool(self, minconn=1, maxconn=10):
+        """
+        Return the shared connection pool for this database.
+        """
+        return get_pool({
+            "host": self.host,
+            "port": self.port,
+            "database": self.database,
+            "user": self.user,
+            "password": self.password
+        }, minconn, maxconn)
+
 
 class StreamLitDatabaseConnector:
 
@@ -40,3 +57,137 @@ class StreamLitDatabaseConnector:
             return connection
         except psycopg2.DatabaseError as database_error:
             raise Exception(f"Unable to connect to the database. Error: {database_error}")
+
+    def pool(self, db_config, minconn=1, maxconn=10):
+        """
+        Return the shared connection pool for db_config.
+        Streamlit reruns reuse the same pool instead of opening a new connection.
+        """
+        return get_pool(db_config, minconn, maxconn)
+
+
+class PooledConnection(psycopg2.extensions.connection):
+
+    def __init__(self, *args, **kwargs):
+        """
+        A psycopg2 connection that remembers which statements it has prepared.
+        """
+        super().__init__(*args, **kwargs)
+        self.prepared_statements = set()
+
+
+class DatabasePool:
+
+    def __init__(self, db_config, minconn=1, maxconn=10, checkout_timeout=30):
+        """
+        Initialize a bounded connection pool for db_config.
+        At most maxconn connections are open at once; callers wait up to
+        checkout_timeout seconds for a free connection.
+        """
+        if minconn < 0 or maxconn < 1 or minconn > maxconn:
+            raise ValueError("Pool size must satisfy 0 <= minconn <= maxconn and maxconn >= 1.")
+
+        self.checkout_timeout = checkout_timeout
+        self.maxconn = maxconn
+        self._slots = threading.BoundedSemaphore(maxconn)
+        try:
+            self._pool = psycopg2.pool.ThreadedConnectionPool(
+                minconn, maxconn, connection_factory=PooledConnection, **db_config
+            )
+        except psycopg2.DatabaseError as database_error:
+            raise Exception(f"Unable to connect to the database. Error: {database_error}")
+
+    @staticmethod
+    def is_healthy(connection):
+        """
+        Check that a borrowed connection is open and answers a trivial query.
+        """
+        if connection.closed:
+            return False
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            connection.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _checkout(self):
+        """
+        Take a healthy connection from the pool, closing broken ones until a healthy one
+        is found. The pool holds at most maxconn idle connections, so after a database
+        restart every stale one is discarded here and the last attempt opens a new one.
+        """
+        for _ in range(self.maxconn + 1):
+            connection = self._pool.getconn()
+            if self.is_healthy(connection):
+                return connection
+            self._pool.putconn(connection, close=True)
+        raise psycopg2.OperationalError("No healthy connection could be opened.")
+
+    @contextmanager
+    def connection(self):
+        """
+        Borrow a connection for the duration of a with block.
+        The transaction is rolled back on return so the next borrower starts clean,
+        and a connection that broke while borrowed is closed instead of reused.
+        """
+        if not self._slots.acquire(timeout=self.checkout_timeout):
+            raise Exception("Timed out waiting for a free database connection.")
+        try:
+            try:
+                connection = self._checkout()
+            except psycopg2.DatabaseError as database_error:
+                raise Exception(f"Unable to connect to the database. Error: {database_error}")
+
+            broken = False
+            try:
+                yield connection
+            except (psycopg2.OperationalError, psycopg2.InterfaceError):
+                broken = True
+                raise
+            finally:
+                if not broken and not connection.closed:
+                    try:
+                        connection.rollback()
+                    except psycopg2.Error:
+                        broken = True
+                self._pool.putconn(connection, close=broken or bool(connection.closed))
+        finally:
+            self._slots.release()
+
+    def close(self):
+        """
+        Close every connection held by the pool.
+        """
+        self._pool.closeall()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_config, minconn=1, maxconn=10):
+    """
+    Return the process-wide DatabasePool for db_config, creating it on first use.
+    """
+    db_config = dict(db_config)
+    key = tuple(sorted((name, str(value)) for name, value in db_config.items()))
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = DatabasePool(db_config, minconn, maxconn)
+        return _pools[key]
+
+
+def env_db_config():
+    """
+    Build db_config from the DB_HOST, DB_PORT, DB_DATABASE, DB_USER and DB_PASSWORD
+    environment variables, for scripts that run outside Streamlit.
+    """
+    return {
+        "host": os.getenv("DB_HOST"),
+        "port": os.getenv("DB_PORT"),
+        "database": os.getenv("DB_DATABASE"),
+        "user": os.getenv("DB_USER"),
+        "password": os.getenv("DB_PASSWORD")
+    }
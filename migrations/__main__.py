@@ -0,0 +1,73 @@
+import sys
+import argparse
+from dotenv import load_dotenv
+from datetime import date
+from database.database_connector import env_db_config, get_pool
+from migrations.explain import explain_queries
+from migrations.runner import MigrationRunner
+from repository.tables.daily_rollups import DailyRollups
+from repository.tables.reconciliation_rows import ReconciliationRows
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m migrations", description="Manage the repository schema and indexes.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("status", help="List applied and pending migrations.")
+    subparsers.add_parser("upgrade", help="Apply pending migrations.")
+    explain_parser = subparsers.add_parser("explain", help="Flag sequential scans of large tables in repository queries.")
+    explain_parser.add_argument("--min-rows", type=int, default=10000, help="Row estimate above which a table counts as large.")
+    refresh_parser = subparsers.add_parser(
+        "refresh-rollups", help="Build the rollups of new dates and rebuild recent dates whose positions changed."
+    )
+    refresh_parser.add_argument(
+        "--trailing-days", type=int, default=DailyRollups.TRAILING_DAYS,
+        help="Days back from the latest date that are re-checked for changed positions; "
+             "corrections to older dates are only picked up with --date.",
+    )
+    refresh_parser.add_argument(
+        "--date", type=date.fromisoformat, action="append", default=[],
+        help="Also rebuild this date of both rollups, e.g. after an older correction; repeatable.",
+    )
+    purge_parser = subparsers.add_parser(
+        "purge-runs", help="Remove the stored incremental position statement reconciliation runs."
+    )
+    purge_parser.add_argument("--date", type=date.fromisoformat, help="Only purge the runs of this statement date.")
+    args = parser.parse_args()
+
+    load_dotenv()
+    pool = get_pool(env_db_config())
+    runner = MigrationRunner(pool)
+
+    if args.command == "status":
+        applied = runner.applied_versions()
+        for migration in runner.migrations:
+            state = "applied" if migration.version in applied else "pending"
+            print(f"{migration.version:>4}  {state:<8} {migration.name}")
+    elif args.command == "upgrade":
+        applied = runner.upgrade()
+        print(f"Applied {len(applied)} migration(s).")
+    elif args.command == "refresh-rollups":
+        rollups = DailyRollups(pool)
+        for day in args.date:
+            rollups.refresh_statement_date(day)
+            rollups.refresh_history_date(day)
+        statement_dates, history_dates = rollups.refresh_pending(args.trailing_days)
+        print(f"Refreshed {len(statement_dates)} statement date(s) and {len(history_dates)} history date(s).")
+    elif args.command == "purge-runs":
+        removed = ReconciliationRows(pool).purge(args.date)
+        print(f"Removed {removed} stored rows.")
+    elif args.command == "explain":
+        flagged = 0
+        for label, scanned in explain_queries(pool, args.min_rows):
+            if scanned:
+                flagged += 1
+                print(f"SEQ SCAN  {label}: {', '.join(scanned)}")
+            else:
+                print(f"ok        {label}")
+        if flagged:
+            print(f"{flagged} repository queries scan large tables sequentially; run 'python -m migrations upgrade'.")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+import json
+from repository.tables import daily_rollups, eod_prices, position_history, position_statements, reconciliation_rows
+from utils.symbology import get_resolver
+
+
+SAMPLE_VALUES = """
+SELECT
+    (SELECT MAX(statement_date) FROM position_statements),
+    (SELECT MAX(report_date) FROM position_history),
+    (SELECT asset_class FROM position_statements ORDER BY statement_date DESC LIMIT 1),
+    (SELECT client_name FROM position_statements ORDER BY statement_date DESC LIMIT 1),
+    (SELECT custodian_name FROM position_statements ORDER BY statement_date DESC LIMIT 1),
+    (SELECT asset_class FROM position_history ORDER BY report_date DESC LIMIT 1)
+"""
+
+TABLE_SIZES = "SELECT relname, reltuples FROM pg_class WHERE relkind = 'r' AND relname = ANY(%s)"
+
+LARGE_TABLES = ["position_statements", "position_history", "eod_prices"]
+
+
+def repository_queries(samples):
+    """
+    Return (label, statement, params) for the hot repository queries, bound to sample values.
+    """
+    statement_date, report_date, asset_class, client_name, custodian_name, history_asset_class = samples
+    resolver = get_resolver()
+    mapping = [list(resolver.mapping.keys()), list(resolver.mapping.values())]
+    queries = []
+    for filters in (["All", "All", "All"], [asset_class, client_name, custodian_name]):
+        statement, params = position_statements.RECORDS.bind([statement_date], filters)
+        queries.append((f"PositionStatements.get_records {filters}", statement, params))
+        statement, params = position_statements.RECORD_COUNT.bind([statement_date], filters)
+        queries.append((f"PositionStatements.count_records {filters}", statement, params))
+        statement, params = eod_prices.RECONCILIATION_RECORDS.bind([statement_date, 5, *mapping], filters)
+        queries.append((f"EodPrices.get_reconciliation_records {filters}", statement, params))
+        statement, params = reconciliation_rows.SYNC.bind([statement_date, *mapping, "explain"], filters)
+        queries.append((f"ReconciliationRows.sync {filters}", statement, params))
+    queries += [
+        ("PositionStatements.get_asset_class_records_for_dates", position_statements.ASSET_CLASS_RECORDS_FOR_DATES, [[statement_date]]),
+        ("EodPrices.get_records", eod_prices.CLOSE_PRICE, [statement_date, "BRK-B.US"]),
+        ("EodPrices.get_close_prices", eod_prices.CLOSE_PRICES, [statement_date]),
+        ("PositionHistory.get_records", position_history.RECORDS, [report_date, history_asset_class]),
+        ("PositionHistory.iter_comparison", position_history.COMPARISON, [report_date, report_date, history_asset_class, 0]),
+        ("PositionHistory.get_range_changes", position_history.RANGE_CHANGES, [report_date, report_date, history_asset_class, 5]),
+        ("DailyRollups.refresh_statement_date", daily_rollups.INSERT_STATEMENT_ROLLUP, [statement_date]),
+        ("DailyRollups.refresh_history_date", daily_rollups.INSERT_HISTORY_ROLLUP, [report_date]),
+        ("DailyRollups.refresh_pending", daily_rollups.PENDING_STATEMENT_DATES, [daily_rollups.DailyRollups.TRAILING_DAYS]),
+    ]
+    return queries
+
+
+def sequential_scans(plan):
+    """
+    Yield the relation names of every Seq Scan node in an EXPLAIN (FORMAT JSON) plan.
+    """
+    if plan.get("Node Type") == "Seq Scan":
+        yield plan.get("Relation Name")
+    for child in plan.get("Plans", []):
+        yield from sequential_scans(child)
+
+
+def explain_queries(pool, min_rows=10000):
+    """
+    Run EXPLAIN on each repository query and return (label, [large tables scanned sequentially]).
+    A table counts as large when pg_class estimates at least min_rows rows.
+    """
+    results = []
+    with pool.connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(TABLE_SIZES, (LARGE_TABLES,))
+            large_tables = {name for name, rows in cursor.fetchall() if rows >= min_rows}
+            cursor.execute(SAMPLE_VALUES)
+            samples = cursor.fetchone()
+
+            for label, statement, params in repository_queries(samples):
+                if statement.name not in conn.prepared_statements:
+                    cursor.execute(statement.prepare_sql())
+                    conn.prepared_statements.add(statement.name)
+                cursor.execute("EXPLAIN (FORMAT JSON) " + statement.execute_sql(), list(params))
+                plan = cursor.fetchone()[0]
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                scanned = sorted({name for name in sequential_scans(plan[0]["Plan"]) if name in large_tables})
+                results.append((label, scanned))
+    return results
@@ -0,0 +1,71 @@
+import psycopg2
+from migrations.versions import MIGRATIONS
+
+
+SCHEMA_MIGRATIONS = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+)
+"""
+
+
+class MigrationRunner:
+
+    def __init__(self, pool, migrations=MIGRATIONS):
+        self.pool = pool
+        self.migrations = sorted(migrations, key=lambda migration: migration.version)
+
+    def applied_versions(self):
+        """
+        Return the versions recorded in schema_migrations, creating the table if needed.
+        """
+        with self.pool.connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(SCHEMA_MIGRATIONS)
+                cursor.execute("SELECT version FROM schema_migrations")
+                versions = {row[0] for row in cursor.fetchall()}
+            conn.commit()
+        return versions
+
+    def pending(self):
+        applied = self.applied_versions()
+        return [migration for migration in self.migrations if migration.version not in applied]
+
+    def apply(self, migration):
+        """
+        Apply one migration and record it in schema_migrations.
+        """
+        with self.pool.connection() as conn:
+            try:
+                conn.autocommit = not migration.transactional
+                with conn.cursor() as cursor:
+                    cursor.execute(migration.sql)
+                    cursor.execute(
+                        "INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+                        (migration.version, migration.name),
+                    )
+                if migration.transactional:
+                    conn.commit()
+            except psycopg2.Error as error:
+                if migration.transactional:
+                    raise Exception(f"Migration {migration.version} ({migration.name}) failed and was rolled back. Error: {error}")
+                raise Exception(
+                    f"Migration {migration.version} ({migration.name}) failed. An interrupted "
+                    f"CREATE INDEX CONCURRENTLY leaves an INVALID index to drop before retrying. Error: {error}"
+                )
+            finally:
+                if conn.autocommit:
+                    conn.autocommit = False
+
+    def upgrade(self):
+        """
+        Apply every pending migration in version order and return them.
+        """
+        applied = []
+        for migration in self.pending():
+            print(f"Applying migration {migration.version}: {migration.name}")
+            self.apply(migration)
+            applied.append(migration)
+        return applied
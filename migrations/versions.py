@@ -0,0 +1,129 @@
+class Migration:
+
+    def __init__(self, version, name, sql, transactional=True):
+        """
+        A numbered schema change. Non-transactional migrations run in autocommit
+        mode, which CREATE INDEX CONCURRENTLY requires. sql is written out in full
+        rather than imported, so an applied migration never changes meaning.
+        """
+        self.version = version
+        self.name = name
+        self.sql = sql
+        self.transactional = transactional
+
+
+MIGRATIONS = [
+    Migration(
+        1,
+        "rollup_tables",
+        """
+        CREATE TABLE IF NOT EXISTS position_statement_rollup (
+            statement_date DATE NOT NULL,
+            asset_class TEXT,
+            client_name TEXT,
+            custodian_name TEXT,
+            total_mtm_rpt_ccy NUMERIC,
+            position_count BIGINT NOT NULL,
+            security_count BIGINT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS position_statement_rollup_date ON position_statement_rollup (statement_date);
+
+        CREATE TABLE IF NOT EXISTS position_statement_asset_class_rollup (
+            statement_date DATE NOT NULL,
+            asset_class TEXT,
+            total_mtm_rpt_ccy NUMERIC,
+            position_count BIGINT NOT NULL,
+            security_count BIGINT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS position_statement_asset_class_rollup_date ON position_statement_asset_class_rollup (statement_date, asset_class);
+
+        CREATE TABLE IF NOT EXISTS position_history_rollup (
+            report_date DATE NOT NULL,
+            asset_class TEXT,
+            total_mtm_rpt_ccy NUMERIC,
+            position_count BIGINT NOT NULL,
+            security_count BIGINT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS position_history_rollup_date ON position_history_rollup (report_date, asset_class);
+
+        CREATE TABLE IF NOT EXISTS rollup_refreshes (
+            rollup_name TEXT NOT NULL,
+            rollup_date DATE NOT NULL,
+            refreshed_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            PRIMARY KEY (rollup_name, rollup_date)
+        );
+        """,
+    ),
+    Migration(
+        2,
+        "position_statements_date_filters_index",
+        """
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS position_statements_date_filters
+        ON position_statements (statement_date, asset_class, client_name, custodian_name)
+        INCLUDE (security_id, mtm_price, isin, ccy, mtm_rpt_ccy)
+        """,
+        transactional=False,
+    ),
+    Migration(
+        3,
+        "eod_prices_date_ticker_index",
+        """
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS eod_prices_date_ticker
+        ON eod_prices (reporting_date, ticker_id)
+        INCLUDE (close)
+        """,
+        transactional=False,
+    ),
+    Migration(
+        4,
+        "position_history_date_class_security_index",
+        """
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS position_history_date_class_security
+        ON position_history (report_date, asset_class, security_id)
+        INCLUDE (mtm_rpt_ccy, position_qty, mtm_price)
+        """,
+        transactional=False,
+    ),
+    Migration(
+        5,
+        "rollup_refresh_signatures",
+        """
+        ALTER TABLE rollup_refreshes
+            ADD COLUMN IF NOT EXISTS source_rows BIGINT,
+            ADD COLUMN IF NOT EXISTS source_signature BIGINT
+        """,
+    ),
+    Migration(
+        6,
+        "ticker_mapping_table",
+        """
+        CREATE TABLE IF NOT EXISTS ticker_mapping (
+            security_id TEXT PRIMARY KEY,
+            ticker_id TEXT NOT NULL
+        )
+        """,
+    ),
+    Migration(
+        7,
+        "reconciliation_rows",
+        """
+        CREATE TABLE IF NOT EXISTS reconciliation_rows (
+            run_key TEXT NOT NULL,
+            statement_date DATE NOT NULL,
+            row_hash TEXT NOT NULL,
+            positions INTEGER NOT NULL,
+            security_id TEXT,
+            isin TEXT,
+            ccy TEXT,
+            mtm_price NUMERIC,
+            close NUMERIC,
+            source_security_id TEXT,
+            difference NUMERIC NOT NULL,
+            matched BOOLEAN NOT NULL,
+            resolved_by TEXT,
+            PRIMARY KEY (run_key, row_hash)
+        );
+        CREATE INDEX IF NOT EXISTS reconciliation_rows_statement_date ON reconciliation_rows (statement_date);
+        """,
+    ),
+]
@@ -1,18 +1,22 @@
 import os
-import json
 import streamlit as st
 from datetime import datetime
 from dotenv import load_dotenv
+from utils.metrics import start_run
+from utils.performance_panel import render_performance_panel
 from database.database_connector import DatabaseConnector
 from database.database_connector import StreamLitDatabaseConnector
 from repository.tables.position_statements import PositionStatements
 from services.asset_class_analyzer import AssetClassAnalyzer
+from services.rendering import render_asset_class
+from utils.report_reader import ReportReader
 
 
 
 def main():
 
     load_dotenv()
+    run_metrics = start_run()
     
     # Local Machine Database Configurations
 
@@ -25,28 +29,49 @@ def main():
     # }
 
     # database = DatabaseConnector(db_config)
-    # connection = database.connect()
+    # pool = database.pool()
     
     
     # Streamlit Share Database Configurations
     
     database = StreamLitDatabaseConnector()
-    connection = database.connect(st.secrets.postgres)
-    position_statements = PositionStatements(connection)
+    pool = database.pool(st.secrets.postgres)
+    position_statements = PositionStatements(pool)
     asset_class_analyzer = AssetClassAnalyzer(position_statements)
 
-    json_input = st.text_area("Enter JSON data:")
-    if json_input:
-        try:
-            json_data_dict = eval(json_input)
-            json_data_formatted_str = json.dumps(json_data_dict, indent=4)
-            json_data = json.loads(json_data_formatted_str)
-            if json_data.get("Table Name") == "Net Worth":
-                selected_date = st.date_input("Select a date", datetime.now())
-                if st.button("Submit"):
-                    asset_class_analyzer.run(json_data, selected_date)
-        except json.JSONDecodeError:
-            st.error("Invalid JSON input.")
+    mode = st.radio("Mode", ["Single report", "Multiple reports"], horizontal=True)
+    if mode == "Multiple reports":
+        json_files = st.file_uploader("Upload JSON reports", type=["json", "txt"], accept_multiple_files=True)
+        reports = []
+        for index, json_file in enumerate(json_files):
+            report_date = st.date_input(f"Date of {json_file.name}", datetime.now(), key=f"date_{index}_{json_file.name}")
+            reports.append((json_file.name, report_date, json_file))
+        if reports and st.button("Submit"):
+            try:
+                for _, _, json_file in reports:
+                    json_file.seek(0)
+                render_asset_class(asset_class_analyzer.analyze_many(
+                    [(name, report_date, ReportReader(json_file)) for name, report_date, json_file in reports]
+                ))
+            except ValueError as e:
+                st.error(str(e))
+        render_performance_panel(run_metrics)
+        return
+
+    json_file = st.file_uploader("Upload a JSON report", type=["json", "txt"])
+    json_input = st.text_area("Or enter JSON data:")
+    source = json_file if json_file is not None else json_input
+    if source:
+        selected_date = st.date_input("Select a date", datetime.now())
+        if st.button("Submit"):
+            if json_file is not None:
+                json_file.seek(0)
+            try:
+                render_asset_class(asset_class_analyzer.analyze(ReportReader(source), selected_date))
+            except ValueError as e:
+                st.error(str(e))
+
+    render_performance_panel(run_metrics)
 
 if __name__ == "__main__":
     if st.session_state.get('authenticated', False):
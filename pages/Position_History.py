@@ -1,17 +1,22 @@
 import os
 import streamlit as st
 from dotenv import load_dotenv
+from utils.metrics import start_run
+from utils.performance_panel import render_performance_panel
 from database.database_connector import DatabaseConnector
 from database.database_connector import StreamLitDatabaseConnector
 from services.position_history_analyzer import PositionHistoryAnalyzer
+from services.rendering import render_position_history, render_position_history_range
 from repository.tables.position_history import PositionHistory
-from datetime import datetime
+from services.dimension_catalogue import DimensionCatalogue
+from datetime import datetime, timedelta
 
 
 def main():
     st.set_page_config(layout="wide")
 
     load_dotenv()
+    run_metrics = start_run()
     
     # Local Machine Database Configurations
 
@@ -24,28 +29,43 @@ def main():
     # }
 
     # database = DatabaseConnector(db_config)
-    # connection = database.connect()
+    # pool = database.pool()
     
     
     # Streamlit Share Database Configurations
     
     database = StreamLitDatabaseConnector()
-    connection = database.connect(st.secrets.postgres)
-    position_history = PositionHistory(connection)
+    pool = database.pool(st.secrets.postgres)
+    position_history = PositionHistory(pool)
     position_history_analyzer = PositionHistoryAnalyzer(position_history)
     
     st.title("Position History Analyzer")
-    asset_classes = position_history.get_unique_asset_classes()
+    if st.sidebar.button("Reload filters"):
+        DimensionCatalogue.invalidate()
+    asset_classes = DimensionCatalogue(pool).history_asset_classes()
     selected_asset_class = st.selectbox("Select an asset class", asset_classes)
+    mode = st.radio("Mode", ["Single date", "Date range"], horizontal=True)
     col1, col2 = st.columns(2)
     with col1:
         threshold = st.number_input('Set a threshold percentage', min_value=1, max_value=10, value=5)
 
     with col2:
-        selected_date = st.date_input("Select a date", datetime.now())
+        if mode == "Date range":
+            selected_dates = st.date_input("Select a date range", (datetime.now() - timedelta(days=30), datetime.now()))
+        else:
+            selected_date = st.date_input("Select a date", datetime.now())
 
     if st.button("Submit"):
-        position_history_analyzer.run(selected_date, selected_asset_class, threshold)
+        if mode == "Date range":
+            if len(selected_dates) != 2:
+                st.warning("Please select a start and an end date.")
+            else:
+                start_date, end_date = selected_dates
+                render_position_history_range(position_history_analyzer.analyze_range(start_date, end_date, selected_asset_class, threshold))
+        else:
+            render_position_history(position_history_analyzer.analyze(selected_date, selected_asset_class, threshold))
+
+    render_performance_panel(run_metrics)
 
 if __name__ == "__main__":
     if st.session_state.get('authenticated', False):
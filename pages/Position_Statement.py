@@ -1,18 +1,24 @@
 import os
 import streamlit as st
 from dotenv import load_dotenv
+from utils.metrics import start_run
+from utils.performance_panel import render_performance_panel
 from database.database_connector import DatabaseConnector
 from database.database_connector import StreamLitDatabaseConnector
 from datetime import datetime
 from repository.tables.position_statements import PositionStatements
 from repository.tables.eod_prices import EodPrices
+from repository.tables.ticker_mappings import TickerMappings
 from services.position_statement_analyzer import PositionStatementAnalyzer
+from services.rendering import position_statement_tables, render_position_statement
+from services.dimension_catalogue import DimensionCatalogue
 
 
 def main():
     st.set_page_config(layout="wide")
 
     load_dotenv()
+    run_metrics = start_run()
 
     # Local Machine Database Configurations
     # 
@@ -25,28 +31,29 @@ def main():
     # }
 
     # database = DatabaseConnector(db_config)
-    # connection = database.connect()
+    # pool = database.pool()
     
     
     # Streamlit Share Database Configurations
     database = StreamLitDatabaseConnector()
-    connection = database.connect(st.secrets.postgres)
-    position_statements = PositionStatements(connection)
-    eod_prices = EodPrices(connection)
-    position_statement_analyzer = PositionStatementAnalyzer(position_statements, eod_prices)
+    pool = database.pool(st.secrets.postgres)
+    position_statements = PositionStatements(pool)
+    eod_prices = EodPrices(pool)
+    ticker_mappings = TickerMappings(pool)
+    position_statement_analyzer = PositionStatementAnalyzer(position_statements, eod_prices, ticker_mappings)
 
-    st.title("Position Statement Analyzer")
-    asset_classes = position_statements.get_unique_asset_classes()
-    client_names = position_statements.get_unique_client_name()
-    custodian_names = position_statements.get_unique_custodian_name()
+    dimension_catalogue = DimensionCatalogue(pool)
+    if st.sidebar.button("Reload filters"):
+        DimensionCatalogue.invalidate()
 
+    st.title("Position Statement Analyzer")
     col1, col2, col3 = st.columns(3)
     with col1:
-        asset_class = st.selectbox("Asset Class", ["All"] + asset_classes)
+        asset_class = st.selectbox("Asset Class", ["All"] + dimension_catalogue.asset_classes())
     with col2:
-        client_name = st.selectbox("Client Name", ["All"] + client_names)
+        client_name = st.selectbox("Client Name", ["All"] + dimension_catalogue.client_names(asset_class))
     with col3:
-        custodian_name = st.selectbox("Custodian Name", ["All"] + custodian_names)
+        custodian_name = st.selectbox("Custodian Name", ["All"] + dimension_catalogue.custodian_names(asset_class, client_name))
 
 
     col4, col5 = st.columns(2)
@@ -54,10 +61,17 @@ def main():
         threshold = st.number_input('Set a threshold percentage', min_value=1, max_value=10, value=5)
     with col5:
         selected_date = st.date_input("Select a date", datetime.now())
-
+    incremental = st.checkbox("Only re-check positions changed since the last run")
 
     if st.button("Submit"):
-        position_statement_analyzer.run(selected_date, asset_class, client_name, custodian_name, threshold)
+        price_tables = position_statement_tables()
+        result = position_statement_analyzer.analyze(
+            selected_date, asset_class, client_name, custodian_name, threshold, on_chunk=price_tables.add,
+            incremental=incremental,
+        )
+        render_position_statement(result, price_tables)
+
+    render_performance_panel(run_metrics)
     
 if __name__ == "__main__":
     if st.session_state.get('authenticated', False):
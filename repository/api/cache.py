@@ -0,0 +1,165 @@
+import os
+import json
+import time
+import sqlite3
+import argparse
+import threading
+
+
+DAY = 24 * 60 * 60
+
+
+class SecurityCache:
+    """
+    On-disk cache of security-resolution answers from OpenFIGI, EODH and YFinance.
+    Entries are keyed by (vendor, identifier). A confirmed miss is stored as a
+    negative entry with a shorter expiry, and the least recently used entries are
+    evicted once the cache holds more than max_entries rows. Eviction runs when the
+    written rows may have pushed the cache over max_entries, or every EVICT_INTERVAL
+    seconds, rather than on every write.
+    """
+
+    DEFAULT_PATH = os.getenv("SECURITY_CACHE_PATH", os.path.join(".cache", "security_resolution.sqlite3"))
+
+    # Seconds an answer is reused, per vendor
+    TTL = {"open_figi": 30 * DAY, "eodh": 7 * DAY, "yfinance": 7 * DAY}
+    NEGATIVE_TTL = {"open_figi": DAY, "eodh": DAY, "yfinance": DAY}
+
+    # Seconds between evictions of expired entries while the cache is below max_entries
+    EVICT_INTERVAL = 60 * 60
+
+    def __init__(self, path=DEFAULT_PATH, max_entries=100000, ttl=None, negative_ttl=None):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.max_entries = max_entries
+        self.ttl = {**self.TTL, **(ttl or {})}
+        self.negative_ttl = {**self.NEGATIVE_TTL, **(negative_ttl or {})}
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "vendor TEXT NOT NULL, key TEXT NOT NULL, value TEXT, "
+            "expires_at REAL NOT NULL, accessed_at REAL NOT NULL, "
+            "PRIMARY KEY (vendor, key))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_expires_at ON entries (expires_at)")
+        self._conn.commit()
+        # Upper bound of the row count since the last eviction; writes that replace rows overcount
+        self._entries = None
+        self._evicted_at = 0
+
+    def get_many(self, vendor, keys):
+        """
+        Return {key: value} for the keys with an unexpired entry.
+        The value of a negative entry is None.
+        """
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+
+        now = time.time()
+        found = {}
+        with self._lock:
+            # Stay well below SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ", ".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, value FROM entries WHERE vendor = ? AND expires_at > ? AND key IN ({placeholders})",
+                    [vendor, now, *chunk],
+                ).fetchall()
+                found.update((key, json.loads(value) if value is not None else None) for key, value in rows)
+                self._conn.executemany(
+                    "UPDATE entries SET accessed_at = ? WHERE vendor = ? AND key = ?",
+                    [(now, vendor, key) for key, _ in rows],
+                )
+            self._conn.commit()
+        return found
+
+    def get(self, vendor, key):
+        """
+        Return (hit, value) for one key; value is None for a cached miss.
+        """
+        found = self.get_many(vendor, [key])
+        return key in found, found.get(key)
+
+    def set_many(self, vendor, items):
+        """
+        Store {key: value} for a vendor. A value of None records a confirmed miss.
+        """
+        if not items:
+            return
+
+        now = time.time()
+        rows = []
+        for key, value in items.items():
+            if value is None:
+                rows.append((vendor, key, None, now + self.negative_ttl[vendor], now))
+            else:
+                rows.append((vendor, key, json.dumps(value), now + self.ttl[vendor], now))
+
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)", rows)
+            if self._entries is not None:
+                self._entries += len(rows)
+            if self._entries is None or self._entries > self.max_entries or now - self._evicted_at > self.EVICT_INTERVAL:
+                self._evict(now)
+            self._conn.commit()
+
+    def set(self, vendor, key, value):
+        self.set_many(vendor, {key: value})
+
+    def _evict(self, now):
+        """
+        Drop expired entries, then the least recently used ones above max_entries.
+        """
+        self._conn.execute("DELETE FROM entries WHERE expires_at <= ?", [now])
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()
+        if count > self.max_entries:
+            self._conn.execute(
+                "DELETE FROM entries WHERE rowid IN (SELECT rowid FROM entries ORDER BY accessed_at LIMIT ?)",
+                [count - self.max_entries],
+            )
+            count = self.max_entries
+        self._entries = count
+        self._evicted_at = now
+
+    def purge(self, vendor=None):
+        """
+        Remove every entry, or only the entries of one vendor. Returns the number removed.
+        """
+        with self._lock:
+            if vendor is None:
+                cursor = self._conn.execute("DELETE FROM entries")
+            else:
+                cursor = self._conn.execute("DELETE FROM entries WHERE vendor = ?", [vendor])
+            self._conn.commit()
+            self._entries = None
+            return cursor.rowcount
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """
+    Return the process-wide SecurityCache, creating it on first use.
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = SecurityCache()
+        return _cache
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage the local security-resolution cache.")
+    parser.add_argument("command", choices=["purge"])
+    parser.add_argument("vendor", nargs="?", choices=sorted(SecurityCache.TTL))
+    args = parser.parse_args()
+
+    removed = get_cache().purge(args.vendor)
+    print(f"Removed {removed} cached entries.")
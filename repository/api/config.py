@@ -0,0 +1,31 @@
+import os
+import threading
+from dotenv import load_dotenv
+
+
+_dotenv_loaded = False
+_dotenv_lock = threading.Lock()
+
+
+def get_setting(section, key, env_var):
+    """
+    Return a vendor setting, read when a client is built rather than on import.
+    The env_var environment variable (or .env entry) is used when set, for local runs
+    and the batch CLI; otherwise the value comes from st.secrets[section][key].
+    Returns None when neither is set.
+    """
+    global _dotenv_loaded
+    with _dotenv_lock:
+        if not _dotenv_loaded:
+            load_dotenv()
+            _dotenv_loaded = True
+
+    value = os.getenv(env_var)
+    if value is not None:
+        return value
+
+    import streamlit as st
+    try:
+        return st.secrets[section][key]
+    except (KeyError, FileNotFoundError):
+        return None
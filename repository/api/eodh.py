@@ -1,58 +1,101 @@
-import os
+from concurrent.futures import ThreadPoolExecutor
 from requests import Session
-from dotenv import load_dotenv
-import streamlit as st
+from requests.adapters import HTTPAdapter
+from repository.api.cache import get_cache
+from repository.api.config import get_setting
+from utils.metrics import bind_context, track
 
 class EodhAPI:
-    load_dotenv()
-    
-    # Local Machine API Configuration
-    # EODH_API_BASE_URL = os.getenv("EODH_API_BASE_URL")
-    # EODH_API_TOKEN = os.getenv("EODH_API_TOKEN")
-    # EODH_API_LIMIT = int(os.getenv("EODH_API_LIMIT"))
-
-    # Streamlit API Configuration
-    EODH_API_BASE_URL = st.secrets["eodh_api"]["base_url"]
-    EODH_API_TOKEN = st.secrets["eodh_api"]["api_token"]
-    EODH_API_LIMIT = st.secrets["eodh_api"]["api_limit"]
-
-    def __init__(self):
-        if not all([self.EODH_API_BASE_URL, self.EODH_API_TOKEN, self.EODH_API_LIMIT]):
+    CACHE_VENDOR = "eodh"
+
+    def __init__(self, max_workers=8, timeout=10, cache=None):
+        self.base_url = get_setting("eodh_api", "base_url", "EODH_API_BASE_URL")
+        self.api_token = get_setting("eodh_api", "api_token", "EODH_API_TOKEN")
+        self.api_limit = get_setting("eodh_api", "api_limit", "EODH_API_LIMIT")
+        if not all([self.base_url, self.api_token, self.api_limit]):
             raise ValueError("EOD API configurations are not fully set.")
         
         self.session = Session()
         self.session.params = {
             "fmt": "json",
-            "api_token": self.EODH_API_TOKEN, 
-            "limit": self.EODH_API_LIMIT,
+            "api_token": self.api_token,
+            "limit": self.api_limit,
         }
         self.session.headers.update({"Accept": "application/json"})
+        # Keep one pooled keep-alive connection per worker thread
+        self.session.mount("https://", HTTPAdapter(pool_maxsize=max_workers))
+        self.session.mount("http://", HTTPAdapter(pool_maxsize=max_workers))
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.cache = cache if cache is not None else get_cache()
         
+    def _search(self, clean_ticker):
+        '''
+        Searches one clean ticker. Returns (data, fetch_successful); an empty result
+        is a confirmed miss and errors are reported as not successful.
+        '''
+        request_url = f"{self.base_url}/api/search/{clean_ticker}"
+
+        try:
+            with track("vendor", "eodh.search") as measurement:
+                response = self.session.get(request_url, timeout=self.timeout)
+                measurement.bytes = len(response.content)
+                response.raise_for_status()
+                response_data = response.json()
+                measurement.rows = len(response_data)
+            return response_data, True
+        except Exception as error:
+            print(f"EodhAPI: Error for {clean_ticker}",error)
+            return [], False
+
     def get_info(self, stock_ticker):
         ''' Fetches information for a given stock ticker. '''
         if not stock_ticker:
             raise ValueError("Stock ticker is required.")
         
         clean_ticker = stock_ticker.split(".")[0]
-        request_url = f"{self.EODH_API_BASE_URL}/api/search/{clean_ticker}"
-
-        try:
-            response = self.session.get(request_url)
-            response.raise_for_status()
-            response_data = response.json()
+        cache_hit, cached_data = self.cache.get(self.CACHE_VENDOR, clean_ticker)
+        if cache_hit:
+            response_data = cached_data or []
             return response_data, response_data != []
-        except Exception as error:
-            print(f"EodhAPI: Error for {clean_ticker}",error)
-            return [], False
+
+        response_data, fetch_successful = self._search(clean_ticker)
+        if fetch_successful:
+            # An empty search result is a confirmed miss and is cached as such
+            self.cache.set(self.CACHE_VENDOR, clean_ticker, response_data or None)
+        return response_data, response_data != []
 
     def get_info_multiple_tickers(self, stock_tickers):
-        ''' Fetches information for multiple stock tickers. '''
+        '''
+        Fetches information for multiple stock tickers.
+        Each clean ticker (the part before the first '.') is looked up once: cached answers are
+        read in one batch, the others are searched concurrently on up to max_workers threads
+        and written to the cache in one batch. Results keep input order.
+        '''
         if not stock_tickers or not isinstance(stock_tickers, list):
             raise ValueError("Stock tickers should be a non-empty list.")
-        combined_results = []
+
+        clean_tickers = []
         for ticker in stock_tickers:
-            ticker_data, fetch_successful = self.get_info(ticker)
-            if fetch_successful and ticker_data:
-                combined_results.extend(ticker_data)
-        return combined_results
+            if not ticker:
+                raise ValueError("Stock ticker is required.")
+            clean_tickers.append(ticker.split(".")[0])
+        clean_tickers = list(dict.fromkeys(clean_tickers))
+
+        responses = {ticker: data or [] for ticker, data in self.cache.get_many(self.CACHE_VENDOR, clean_tickers).items()}
+        uncached = [ticker for ticker in clean_tickers if ticker not in responses]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            searches = list(executor.map(bind_context(self._search), uncached))
+
+        to_cache = {}
+        for ticker, (response_data, fetch_successful) in zip(uncached, searches):
+            responses[ticker] = response_data
+            if fetch_successful:
+                # An empty search result is a confirmed miss and is cached as such
+                to_cache[ticker] = response_data or None
+        self.cache.set_many(self.CACHE_VENDOR, to_cache)
 
+        combined_results = []
+        for ticker in clean_tickers:
+            combined_results.extend(responses[ticker])
+        return combined_results
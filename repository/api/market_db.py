@@ -1,37 +1,155 @@
 import os
+import json
+import tempfile
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 import requests
-from dotenv import load_dotenv
-import streamlit as st
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from repository.api.config import get_setting
+from utils.metrics import bind_context, track
+
+try:
+    import fcntl
+except ImportError:  # Windows: the registry is then only locked within one process
+    fcntl = None
 
-load_dotenv()
 
 class MarketDBApi:
 
-    # Local Machine API Configuration
-    # MARKET_DB_TOKEN = os.getenv('MARKET_DB_TOKEN')
+    # Local record of symbols the server has already accepted
+    REGISTRY_PATH = os.getenv("MARKET_DB_REGISTRY_PATH", os.path.join(".cache", "market_db_registered.json"))
+    TICKER_EXISTS_MESSAGE = "Ticker already exists."
 
-    # Streamlit Configuration
-    MARKET_DB_TOKEN = st.secrets["market_db_api"]["market_db_token"]
+    # Serializes the load-merge-save of the registry file across the sessions of a process;
+    # the lock file next to the registry serializes it across processes
+    _registry_lock = threading.Lock()
 
-    def __init__(self):
+    def __init__(self, max_workers=8, timeout=10, registry_path=REGISTRY_PATH):
         self.url = 'https://market-server.ethan-ai.com/api/add-ticker/'
+        self.token = get_setting("market_db_api", "market_db_token", "MARKET_DB_TOKEN")
+        if not self.token:
+            raise ValueError("MarketDB API token is not set.")
         self.headers = {
-            "Authorization": f"Token {self.MARKET_DB_TOKEN}",
+            "Authorization": f"Token {self.token}",
             "type": "application/json",
             "Content-Type": "application/json"
         }
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.registry_path = registry_path
 
-    def add_tickers(self, symbol_list):
-        errored_symbols = []
-        for symbol in symbol_list:
-            payload = {"symbol": symbol}
+        # Adding a ticker is idempotent on the server, so POSTs are safe to retry
+        retry = Retry(total=3, backoff_factor=0.5, status_forcelist=[502, 503, 504], allowed_methods=frozenset(["POST"]))
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        self.session.mount("https://", HTTPAdapter(max_retries=retry, pool_maxsize=max_workers))
+
+    @contextmanager
+    def _locked_registry(self):
+        """
+        Hold the registry lock of this process and an exclusive flock on the registry's
+        lock file, so the batch CLI and the Streamlit app never interleave their updates.
+        """
+        with self._registry_lock:
+            if fcntl is None:
+                yield
+                return
+            directory = os.path.dirname(self.registry_path) or "."
+            os.makedirs(directory, exist_ok=True)
+            with open(self.registry_path + ".lock", "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _load_registry(self):
+        try:
+            with open(self.registry_path, "r") as file:
+                return set(json.load(file))
+        except (FileNotFoundError, ValueError):
+            return set()
+
+    def _save_registry(self, registered_symbols):
+        """
+        Write the registry to a temporary file and move it into place, so a reader
+        never sees a partly written file.
+        """
+        directory = os.path.dirname(self.registry_path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".market_db_registered.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as file:
+                json.dump(sorted(registered_symbols), file)
+            os.replace(temp_path, self.registry_path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+    def _record_registered(self, symbols):
+        """
+        Add symbols to the registry. The file is read again under the lock, so symbols
+        recorded by another session or process since this run loaded it are kept.
+        """
+        with self._locked_registry():
+            registered_symbols = self._load_registry()
+            if not registered_symbols.issuperset(symbols):
+                self._save_registry(registered_symbols.union(symbols))
+
+    def _register(self, symbol):
+        """
+        Post one symbol and return "created", "existing" or "failed".
+        """
+        with track("vendor", "market_db.add_ticker") as measurement:
+            try:
+                response = self.session.post(self.url, json={"symbol": symbol}, timeout=self.timeout)
+            except requests.exceptions.RequestException as err:
+                print(f"MarketDBApi: Error for {symbol}", err)
+                measurement.error = True
+                return "failed"
+
+            measurement.bytes = len(response.content)
+            if response.ok:
+                return "created"
             try:
-                response = requests.post(self.url, json=payload, headers=self.headers)
-                response.raise_for_status()
-
-            except requests.exceptions.HTTPError as http_err:
-                if response.json() and "message" in response.json():
-                    if response.json()["message"] != "Ticker already exists.":                
-                        errored_symbols.append(symbol)
-            except Exception as err:
-                errored_symbols.append(symbol)
+                message = response.json().get("message")
+            except ValueError:
+                message = None
+            if message == self.TICKER_EXISTS_MESSAGE:
+                return "existing"
+            print(f"MarketDBApi: Error for {symbol}", response.status_code, message)
+            measurement.error = True
+            return "failed"
+
+    def register_tickers(self, symbol_list):
+        """
+        Register symbols concurrently and return a dict of created, existing and failed symbols.
+        Symbols recorded as registered by an earlier run are reported as existing without a request.
+        """
+        symbols = list(dict.fromkeys(symbol_list))
+        with self._locked_registry():
+            registered_symbols = self._load_registry()
+        result = {
+            "created": [],
+            "existing": [symbol for symbol in symbols if symbol in registered_symbols],
+            "failed": [],
+        }
+
+        new_symbols = [symbol for symbol in symbols if symbol not in registered_symbols]
+        if new_symbols:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                statuses = list(executor.map(bind_context(self._register), new_symbols))
+            for symbol, status in zip(new_symbols, statuses):
+                result[status].append(symbol)
+
+            self._record_registered(result["created"] + result["existing"])
+
+        return result
+
+    def add_tickers(self, symbol_list):
+        """
+        Register symbols and return the ones that could not be added.
+        """
+        return self.register_tickers(symbol_list)["failed"]
@@ -1,30 +1,69 @@
+import time
 import requests
 import pandas as pd
-from dotenv import load_dotenv
-import os
-import streamlit as st
+from repository.api.cache import get_cache
+from repository.api.config import get_setting
+from utils.metrics import track
 
 class OpenFigiAPI:
-    load_dotenv()
 
-    # Local machine API Configuration
-    # OPEN_FIGI_API_KEY = os.getenv("OPEN_FIGI_API_KEY")
-    # OPEN_FIGI_BASE_URL = os.getenv("OPEN_FIGI_BASE_URL")
-    # OPEN_FIGI_MAPPING_URL = OPEN_FIGI_BASE_URL + "/v3/mapping/"
+    # Jobs allowed in one mapping request, with and without an API key
+    MAX_JOBS_WITH_KEY = 100
+    MAX_JOBS_WITHOUT_KEY = 10
+    MAX_RETRIES = 3
+    CACHE_VENDOR = "open_figi"
+    NOT_FOUND_WARNING = "No identifier found."
+    MISSING_ISIN_REASON = "Missing ISIN."
 
-    # Streamlit API Configuration
-    OPEN_FIGI_BASE_URL = st.secrets["open_figi"]["base_url"]
-    OPEN_FIGI_API_KEY = st.secrets["open_figi"]["api_key"]
-    OPEN_FIGI_MAPPING_URL = OPEN_FIGI_BASE_URL + "/v3/mapping/"
-
-    def __init__(self): 
-        if not all([self.OPEN_FIGI_API_KEY, self.OPEN_FIGI_BASE_URL, self.OPEN_FIGI_MAPPING_URL]):
+    def __init__(self, timeout=30, cache=None): 
+        self.api_key = get_setting("open_figi", "api_key", "OPEN_FIGI_API_KEY")
+        self.base_url = get_setting("open_figi", "base_url", "OPEN_FIGI_BASE_URL")
+        if not self.base_url:
             raise ValueError("OpenFIGI API configurations are not fully set.")
+        self.mapping_url = self.base_url + "/v3/mapping/"
         
-        self.headers = {
-            'Content-Type': 'text/json',
-            'X-OPENFIGI-APIKEY': self.OPEN_FIGI_API_KEY,
-        }
+        # Without an API key OpenFIGI still answers, with smaller requests and a lower rate limit
+        self.headers = {'Content-Type': 'text/json'}
+        if self.api_key:
+            self.headers['X-OPENFIGI-APIKEY'] = self.api_key
+        self.timeout = timeout
+        self.max_jobs = self.MAX_JOBS_WITH_KEY if self.api_key else self.MAX_JOBS_WITHOUT_KEY
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        self._resume_at = 0
+        self.cache = cache if cache is not None else get_cache()
+
+    def _wait_for_rate_limit(self):
+        ''' Sleep until the rate-limit window announced by the last response has reset. '''
+        delay = self._resume_at - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def _update_rate_limit(self, response, attempt):
+        ''' Read the ratelimit-remaining / ratelimit-reset headers of a response. '''
+        remaining = response.headers.get("ratelimit-remaining")
+        reset = response.headers.get("ratelimit-reset")
+        if response.status_code == 429 or remaining == "0":
+            try:
+                delay = float(reset)
+            except (TypeError, ValueError):
+                delay = 2 ** attempt
+            self._resume_at = time.monotonic() + delay
+
+    def _post_mapping(self, jobs):
+        ''' Send one mapping request, waiting out the rate limit and retrying on 429. '''
+        for attempt in range(self.MAX_RETRIES + 1):
+            self._wait_for_rate_limit()
+            with track("vendor", "open_figi.mapping") as measurement:
+                response = self.session.post(self.mapping_url, json=jobs, timeout=self.timeout)
+                measurement.rows = len(jobs)
+                measurement.bytes = len(response.content)
+                measurement.error = not response.ok
+            self._update_rate_limit(response, attempt)
+            if response.status_code == 429 and attempt < self.MAX_RETRIES:
+                continue
+            response.raise_for_status()
+            return response.json()
 
     def get_ticker_data(self, isin):
         if not isin:
@@ -34,9 +73,7 @@ class OpenFigiAPI:
             {"idType": "ID_ISIN", "idValue": isin},
         ]
         try:
-            response = requests.post(self.OPEN_FIGI_MAPPING_URL, headers=self.headers, json=data)
-            response.raise_for_status()  
-            api_data = response.json()
+            api_data = self._post_mapping(data)
 
             combined_data = []
             for item in api_data:
@@ -46,3 +83,54 @@ class OpenFigiAPI:
             return df
         except Exception as error:
             raise error
+
+    def map_isins(self, isins):
+        '''
+        Map any number of ISINs, packing up to max_jobs jobs into each request.
+        Returns a DataFrame of FIGI results with an 'isin' column, and a DataFrame of
+        ISINs that were not mapped with the reason reported for each of them.
+        A failed request only marks the ISINs of its own batch as failed.
+        ISINs answered by the local cache are not sent; confirmed misses are cached too.
+        Empty ISINs are not sent either and are reported as unmapped.
+        '''
+        if not isins or not isinstance(isins, list):
+            raise ValueError("ISINs should be a non-empty list.")
+
+        all_isins = list(dict.fromkeys(isins))
+        unique_isins = [isin for isin in all_isins if isin and not pd.isna(isin)]
+        cached = self.cache.get_many(self.CACHE_VENDOR, unique_isins)
+        results_by_isin = {isin: {"data": data} if data is not None else {"warning": self.NOT_FOUND_WARNING} for isin, data in cached.items()}
+        failures = {isin: self.MISSING_ISIN_REASON for isin in all_isins if not isin or pd.isna(isin)}
+
+        uncached_isins = [isin for isin in unique_isins if isin not in cached]
+        for start in range(0, len(uncached_isins), self.max_jobs):
+            batch = uncached_isins[start:start + self.max_jobs]
+            jobs = [{"idType": "ID_ISIN", "idValue": isin} for isin in batch]
+            try:
+                results = self._post_mapping(jobs)
+            except Exception as error:
+                print(f"OpenFigiAPI: Error for batch starting at {batch[0]}", error)
+                failures.update((isin, str(error)) for isin in batch)
+                continue
+
+            to_cache = {}
+            for isin, result in zip(batch, results):
+                results_by_isin[isin] = result
+                if result.get("data"):
+                    to_cache[isin] = result["data"]
+                elif result.get("warning") == self.NOT_FOUND_WARNING:
+                    to_cache[isin] = None
+            self.cache.set_many(self.CACHE_VENDOR, to_cache)
+
+        mapped_rows = []
+        for isin in unique_isins:
+            result = results_by_isin.get(isin)
+            if result is None:
+                continue
+            if result.get("data"):
+                mapped_rows.extend({"isin": isin, **item} for item in result["data"])
+            else:
+                failures[isin] = result.get("error") or result.get("warning") or self.NOT_FOUND_WARNING
+
+        failed = [{"ISIN": isin, "Reason": failures[isin]} for isin in all_isins if isin in failures]
+        return pd.DataFrame(mapped_rows), pd.DataFrame(failed, columns=["ISIN", "Reason"])
@@ -0,0 +1,60 @@
+import threading
+
+
+_clients = {}
+_lock = threading.Lock()
+
+
+def _open_figi():
+    from repository.api.open_figi import OpenFigiAPI
+    return OpenFigiAPI()
+
+
+def _eodh():
+    from repository.api.eodh import EodhAPI
+    return EodhAPI()
+
+
+def _yfinance():
+    from repository.api.yfinance import YFinanceAPI
+    return YFinanceAPI()
+
+
+def _market_db():
+    from repository.api.market_db import MarketDBApi
+    return MarketDBApi()
+
+
+FACTORIES = {
+    "open_figi": _open_figi,
+    "eodh": _eodh,
+    "yfinance": _yfinance,
+    "market_db": _market_db,
+}
+
+
+def get_client(name):
+    """
+    Return the process-wide client for a vendor, importing its module and building it on first use.
+    Clients are shared by every session and thread, so sessions reuse their HTTP connections
+    and OpenFIGI rate limit state.
+    """
+    with _lock:
+        if name not in _clients:
+            _clients[name] = FACTORIES[name]()
+        return _clients[name]
+
+
+def get_api_clients():
+    """
+    Return the (OpenFigi, EODH, YFinance, MarketDB) clients.
+    """
+    return get_client("open_figi"), get_client("eodh"), get_client("yfinance"), get_client("market_db")
+
+
+def reset():
+    """
+    Drop the built clients so the next use reads the configuration again.
+    """
+    with _lock:
+        _clients.clear()
@@ -1,7 +1,27 @@
-import yfinance as yf
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 import pandas as pd
-import streamlit as st
+from repository.api.cache import get_cache
+from utils.metrics import bind_context, track
+
+
+def _import_yfinance():
+    """
+    Import the yfinance package on first use; it is slow to import and only needed for lookups.
+    """
+    import yfinance as yf
+    return yf
+
+
 class YFinanceAPI:
+
+    # Seconds between checks for finished or timed-out lookups in parallel mode
+    POLL_INTERVAL = 0.2
+    CACHE_VENDOR = "yfinance"
+
+    def __init__(self, cache=None):
+        self.cache = cache if cache is not None else get_cache()
+
     def get_data_multiple_tickers(self, tickers):
         """
         Fetch ticker information using yfinance API for the given tickers.
@@ -13,7 +33,7 @@ class YFinanceAPI:
         ticker_data = []
         for ticker in tickers:
             try:
-                response = yf.Ticker(ticker)
+                response = _import_yfinance().Ticker(ticker)
                 if not response:
                     print(f"No response received for ticker {ticker}, skipping...")
                     continue
@@ -35,3 +55,88 @@ class YFinanceAPI:
         else:
             print("No data received for any of the tickers, returning None.")
             return pd.DataFrame()
+
+    def _fetch_ticker(self, ticker, started):
+        """
+        Look up one ticker and return its ISIN/Ticker/Currency row.
+        The start time is recorded so the caller can enforce the per-ticker timeout.
+        Returns None for a ticker without info.
+        """
+        started[ticker] = time.monotonic()
+        with track("vendor", "yfinance.info") as measurement:
+            info = _import_yfinance().Ticker(ticker).info
+            measurement.rows = int(bool(info))
+        if not info:
+            return None
+        return {'ISIN': info.get('isin'), 'Ticker': ticker, 'Currency': info.get('currency')}
+
+    def get_data_multiple_tickers_parallel(self, tickers, max_workers=8, ticker_timeout=15, deadline=60):
+        """
+        Fetch ticker information for the given tickers on a pool of worker threads.
+        A lookup running longer than ticker_timeout seconds, or still unfinished when
+        the overall deadline expires, is abandoned and reported as a failure.
+        Finished lookups are cached in one batch; a ticker without info is cached as a
+        miss and lookup errors are not cached.
+        Returns a DataFrame with the ticker information and a DataFrame of failures.
+        """
+        if not tickers or not isinstance(tickers, list):
+            raise ValueError("Tickers should be a non-empty list.")
+
+        unique_tickers = list(dict.fromkeys(tickers))
+        started = {}
+        results = {}
+        failures = {}
+        for ticker, row in self.cache.get_many(self.CACHE_VENDOR, unique_tickers).items():
+            if row is None:
+                failures[ticker] = "No info received (cached)"
+            else:
+                results[ticker] = row
+        deadline_at = time.monotonic() + deadline
+
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        futures = {
+            executor.submit(bind_context(self._fetch_ticker), ticker, started): ticker
+            for ticker in unique_tickers
+            if ticker not in results and ticker not in failures
+        }
+        pending = set(futures)
+        to_cache = {}
+        try:
+            while pending and time.monotonic() < deadline_at:
+                timeout = min(self.POLL_INTERVAL, deadline_at - time.monotonic())
+                done, pending = wait(pending, timeout=max(timeout, 0), return_when=FIRST_COMPLETED)
+                for future in done:
+                    ticker = futures[future]
+                    try:
+                        row = future.result()
+                    except Exception as e:
+                        print(f"Error fetching information for ticker {ticker}: {e}")
+                        failures[ticker] = str(e)
+                        continue
+                    to_cache[ticker] = row
+                    if row is None:
+                        print(f"Error fetching information for ticker {ticker}: No info received")
+                        failures[ticker] = "No info received"
+                    else:
+                        results[ticker] = row
+
+                now = time.monotonic()
+                for future in list(pending):
+                    ticker = futures[future]
+                    if ticker in started and now - started[ticker] > ticker_timeout:
+                        failures[ticker] = f"Timed out after {ticker_timeout} seconds"
+                        pending.discard(future)
+
+            for future in pending:
+                failures[futures[future]] = "Overall deadline reached"
+        finally:
+            # Abandoned lookups finish in the background; queued ones are dropped
+            executor.shutdown(wait=False, cancel_futures=True)
+            self.cache.set_many(self.CACHE_VENDOR, to_cache)
+
+        ticker_data = [results[ticker] for ticker in unique_tickers if ticker in results]
+        failed = [{'Ticker': ticker, 'Reason': failures[ticker]} for ticker in unique_tickers if ticker in failures]
+        return (
+            pd.DataFrame(ticker_data, columns=['ISIN', 'Ticker', 'Currency']),
+            pd.DataFrame(failed, columns=['Ticker', 'Reason']),
+        )
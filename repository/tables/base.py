@@ -0,0 +1,111 @@
+import pandas as pd
+import psycopg2
+import psycopg2.errors
+import psycopg2.extensions
+from utils.metrics import track
+
+
+class PooledTable:
+
+    # Rows fetched per round trip by a server-side cursor, and rows per streamed chunk
+    CHUNK_SIZE = 20000
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    @staticmethod
+    def execute(conn, cursor, statement, params=()):
+        """
+        Execute a prepared statement, preparing it first if this connection has not seen it.
+        Prepared names are tracked per pooled connection; if the server has lost a statement
+        (e.g. after a reconnect behind a proxy) it is prepared again and the call retried.
+        Inside an open transaction, such as the steps of execute_statements, the retry rolls
+        back to a savepoint so the earlier steps are kept.
+        """
+        in_transaction = conn.info.transaction_status != psycopg2.extensions.TRANSACTION_STATUS_IDLE
+        prepared = conn.prepared_statements
+        if statement.name not in prepared:
+            cursor.execute(statement.prepare_sql())
+            prepared.add(statement.name)
+        if in_transaction:
+            PooledTable.savepoint(conn, "SAVEPOINT execute_prepared")
+        try:
+            cursor.execute(statement.execute_sql(), list(params))
+        except psycopg2.errors.InvalidSqlStatementName:
+            if in_transaction:
+                PooledTable.savepoint(conn, "ROLLBACK TO SAVEPOINT execute_prepared")
+            else:
+                conn.rollback()
+            cursor.execute(statement.prepare_sql())
+            cursor.execute(statement.execute_sql(), list(params))
+        if in_transaction:
+            PooledTable.savepoint(conn, "RELEASE SAVEPOINT execute_prepared")
+
+    @staticmethod
+    def savepoint(conn, command):
+        """
+        Run a savepoint command on its own cursor, so the results of the statement on the
+        caller's cursor stay readable.
+        """
+        with conn.cursor() as cursor:
+            cursor.execute(command)
+
+    def fetchall(self, statement, params=()):
+        """
+        Run a statement on a borrowed connection and return all rows.
+        """
+        with track("query", statement.name) as measurement:
+            with self.pool.connection() as conn:
+                with conn.cursor() as cursor:
+                    self.execute(conn, cursor, statement, params)
+                    rows = cursor.fetchall()
+            measurement.rows = len(rows)
+            return rows
+
+    def fetchone(self, statement, params=()):
+        """
+        Run a statement on a borrowed connection and return the first row.
+        """
+        with track("query", statement.name) as measurement:
+            with self.pool.connection() as conn:
+                with conn.cursor() as cursor:
+                    self.execute(conn, cursor, statement, params)
+                    row = cursor.fetchone()
+            measurement.rows = int(row is not None)
+            return row
+
+    def stream(self, statement, params=(), columns=None, chunk_size=None):
+        """
+        Run a statement on a named server-side cursor and yield its rows as DataFrames of
+        at most chunk_size rows, so only one chunk is held in memory at a time.
+        The connection stays borrowed until the generator is exhausted or closed, and the
+        recorded query time includes the time spent consuming each chunk.
+        """
+        chunk_size = chunk_size or self.CHUNK_SIZE
+        with track("query", statement.name) as measurement:
+            with self.pool.connection() as conn:
+                with conn.cursor(name=f"{statement.name}_cursor") as cursor:
+                    cursor.itersize = chunk_size
+                    cursor.execute(statement.cursor_sql(), statement.cursor_params(params))
+                    while True:
+                        rows = cursor.fetchmany(chunk_size)
+                        if not rows:
+                            break
+                        measurement.rows += len(rows)
+                        yield pd.DataFrame(rows, columns=columns)
+
+    def execute_statements(self, steps):
+        """
+        Run (statement, params) steps in one transaction on a borrowed connection and commit.
+        Return the rows of the last step, or None when it returns no rows.
+        """
+        rows = None
+        with self.pool.connection() as conn:
+            with conn.cursor() as cursor:
+                for statement, params in steps:
+                    with track("query", statement.name) as measurement:
+                        self.execute(conn, cursor, statement, params)
+                        measurement.rows = max(cursor.rowcount, 0)
+                rows = cursor.fetchall() if cursor.description is not None else None
+            conn.commit()
+        return rows
@@ -0,0 +1,257 @@
+from repository.tables.base import PooledTable
+from repository.tables.statements import Statement
+
+
+# Signature of the rows of a date: their count and the sum of a hash of every row,
+# so added, removed and corrected rows all change it.
+STATEMENT_SIGNATURE = """
+    SELECT COUNT(*), COALESCE(SUM(hashtext(ROW(asset_class, client_name, custodian_name, security_id, mtm_rpt_ccy)::text)), 0)
+    FROM position_statements WHERE statement_date = {date}
+"""
+
+HISTORY_SIGNATURE = """
+    SELECT COUNT(*), COALESCE(SUM(hashtext(ROW(asset_class, security_id, mtm_rpt_ccy)::text)), 0)
+    FROM position_history WHERE report_date = {date}
+"""
+
+# Distinct dates of a table found with a recursive skip scan over its date index, so
+# listing them costs one index probe per date rather than a full scan, minus the dates
+# that already have a rollup. Readers aggregate these dates from the raw table until the
+# refresh-rollups job has built them, so a newly loaded date is never read as empty.
+UNREFRESHED_STATEMENT_DATES = """
+    WITH RECURSIVE dates AS (
+        (SELECT statement_date FROM position_statements ORDER BY statement_date LIMIT 1)
+        UNION ALL
+        SELECT (SELECT statement_date FROM position_statements WHERE statement_date > d.statement_date ORDER BY statement_date LIMIT 1)
+        FROM dates d WHERE d.statement_date IS NOT NULL
+    )
+    SELECT statement_date FROM dates WHERE statement_date IS NOT NULL
+    EXCEPT
+    SELECT rollup_date FROM rollup_refreshes WHERE rollup_name = 'position_statements'
+"""
+
+UNREFRESHED_HISTORY_DATES = """
+    WITH RECURSIVE dates AS (
+        (SELECT report_date FROM position_history ORDER BY report_date LIMIT 1)
+        UNION ALL
+        SELECT (SELECT report_date FROM position_history WHERE report_date > d.report_date ORDER BY report_date LIMIT 1)
+        FROM dates d WHERE d.report_date IS NOT NULL
+    )
+    SELECT report_date FROM dates WHERE report_date IS NOT NULL
+    EXCEPT
+    SELECT rollup_date FROM rollup_refreshes WHERE rollup_name = 'position_history'
+"""
+
+# Condition that holds while date has no rollup yet; rollup readers add the raw aggregate
+# of the date under it.
+STATEMENT_DATE_UNREFRESHED = (
+    "NOT EXISTS (SELECT 1 FROM rollup_refreshes WHERE rollup_name = 'position_statements' AND rollup_date = {date})"
+)
+
+HISTORY_DATE_UNREFRESHED = (
+    "NOT EXISTS (SELECT 1 FROM rollup_refreshes WHERE rollup_name = 'position_history' AND rollup_date = {date})"
+)
+
+# Dates never refreshed, plus dates of the last $1 days whose signature differs from the one
+# recorded at their last refresh.
+PENDING_STATEMENT_DATES = Statement(
+    "daily_rollups_pending_statement_dates",
+    """
+    (""" + UNREFRESHED_STATEMENT_DATES + """)
+    UNION
+    SELECT r.rollup_date
+    FROM rollup_refreshes r
+    CROSS JOIN LATERAL (""" + STATEMENT_SIGNATURE.format(date="r.rollup_date") + """) AS s(source_rows, source_signature)
+    WHERE r.rollup_name = 'position_statements'
+      AND r.rollup_date > (SELECT MAX(statement_date) FROM position_statements) - $1
+      AND (r.source_rows, r.source_signature) IS DISTINCT FROM (s.source_rows, s.source_signature)
+    ORDER BY 1
+    """,
+    ["integer"],
+)
+
+PENDING_HISTORY_DATES = Statement(
+    "daily_rollups_pending_history_dates",
+    """
+    (""" + UNREFRESHED_HISTORY_DATES + """)
+    UNION
+    SELECT r.rollup_date
+    FROM rollup_refreshes r
+    CROSS JOIN LATERAL (""" + HISTORY_SIGNATURE.format(date="r.rollup_date") + """) AS s(source_rows, source_signature)
+    WHERE r.rollup_name = 'position_history'
+      AND r.rollup_date > (SELECT MAX(report_date) FROM position_history) - $1
+      AND (r.source_rows, r.source_signature) IS DISTINCT FROM (s.source_rows, s.source_signature)
+    ORDER BY 1
+    """,
+    ["integer"],
+)
+
+LOCK_ROLLUP_DATE = Statement(
+    "daily_rollups_lock_date",
+    "SELECT pg_advisory_xact_lock(hashtext($1 || ':' || $2::text))",
+    ["text", "date"],
+)
+
+MARK_STATEMENT_REFRESHED = Statement(
+    "daily_rollups_mark_statement_refreshed",
+    """
+    INSERT INTO rollup_refreshes (rollup_name, rollup_date, source_rows, source_signature)
+    SELECT 'position_statements', $1, source_rows, source_signature
+    FROM (""" + STATEMENT_SIGNATURE.format(date="$1") + """) AS s(source_rows, source_signature)
+    ON CONFLICT (rollup_name, rollup_date) DO UPDATE
+    SET refreshed_at = now(), source_rows = EXCLUDED.source_rows, source_signature = EXCLUDED.source_signature
+    """,
+    ["date"],
+)
+
+MARK_HISTORY_REFRESHED = Statement(
+    "daily_rollups_mark_history_refreshed",
+    """
+    INSERT INTO rollup_refreshes (rollup_name, rollup_date, source_rows, source_signature)
+    SELECT 'position_history', $1, source_rows, source_signature
+    FROM (""" + HISTORY_SIGNATURE.format(date="$1") + """) AS s(source_rows, source_signature)
+    ON CONFLICT (rollup_name, rollup_date) DO UPDATE
+    SET refreshed_at = now(), source_rows = EXCLUDED.source_rows, source_signature = EXCLUDED.source_signature
+    """,
+    ["date"],
+)
+
+DELETE_STATEMENT_ROLLUP = Statement(
+    "daily_rollups_delete_statement_rollup",
+    "DELETE FROM position_statement_rollup WHERE statement_date = $1",
+    ["date"],
+)
+
+INSERT_STATEMENT_ROLLUP = Statement(
+    "daily_rollups_insert_statement_rollup",
+    """
+    INSERT INTO position_statement_rollup
+    SELECT statement_date, asset_class, client_name, custodian_name,
+           SUM(mtm_rpt_ccy), COUNT(*), COUNT(DISTINCT security_id)
+    FROM position_statements WHERE statement_date = $1
+    GROUP BY statement_date, asset_class, client_name, custodian_name
+    """,
+    ["date"],
+)
+
+DELETE_STATEMENT_ASSET_CLASS_ROLLUP = Statement(
+    "daily_rollups_delete_statement_asset_class_rollup",
+    "DELETE FROM position_statement_asset_class_rollup WHERE statement_date = $1",
+    ["date"],
+)
+
+INSERT_STATEMENT_ASSET_CLASS_ROLLUP = Statement(
+    "daily_rollups_insert_statement_asset_class_rollup",
+    """
+    INSERT INTO position_statement_asset_class_rollup
+    SELECT statement_date, asset_class, SUM(mtm_rpt_ccy), COUNT(*), COUNT(DISTINCT security_id)
+    FROM position_statements WHERE statement_date = $1
+    GROUP BY statement_date, asset_class
+    """,
+    ["date"],
+)
+
+DELETE_HISTORY_ROLLUP = Statement(
+    "daily_rollups_delete_history_rollup",
+    "DELETE FROM position_history_rollup WHERE report_date = $1",
+    ["date"],
+)
+
+INSERT_HISTORY_ROLLUP = Statement(
+    "daily_rollups_insert_history_rollup",
+    """
+    INSERT INTO position_history_rollup
+    SELECT report_date, asset_class, SUM(mtm_rpt_ccy), COUNT(*), COUNT(DISTINCT security_id)
+    FROM position_history WHERE report_date = $1
+    GROUP BY report_date, asset_class
+    """,
+    ["date"],
+)
+
+# Every filter combination of the statements and the asset classes of the history, from
+# the (small) rollup tables plus the raw rows of dates that have no rollup yet.
+DIMENSIONS = Statement(
+    "daily_rollups_dimensions",
+    """
+    SELECT 'position_statements' AS source, asset_class, client_name, custodian_name
+    FROM position_statement_rollup
+    UNION
+    SELECT 'position_statements', asset_class, client_name, custodian_name
+    FROM position_statements
+    WHERE statement_date IN (""" + UNREFRESHED_STATEMENT_DATES + """)
+    UNION
+    SELECT 'position_history', asset_class, NULL, NULL
+    FROM position_history_rollup
+    UNION
+    SELECT 'position_history', asset_class, NULL, NULL
+    FROM position_history
+    WHERE report_date IN (""" + UNREFRESHED_HISTORY_DATES + """)
+    """,
+)
+
+
+class DailyRollups(PooledTable):
+    """
+    Daily aggregates of position_statements and position_history.
+    position_statement_rollup is kept per (date, asset_class, client, custodian) and
+    position_statement_asset_class_rollup / position_history_rollup per (date, asset_class),
+    each with SUM(mtm_rpt_ccy), the position count and the distinct security count.
+    The tables are created by the migrations and kept current by the refresh-rollups job
+    (python -m migrations refresh-rollups), which should run after every load. Readers
+    only read them and aggregate the raw rows of dates the job has not built yet, so a
+    new date is correct before its rollup exists, only slower to read.
+    A date is rebuilt when its rows change only while it is within TRAILING_DAYS of the
+    latest date; a correction to an older date stays invisible to the rollup readers
+    until the job is run with --date for it or with a larger --trailing-days.
+    """
+
+    # Days back from the latest date whose rows are re-checked for late or corrected positions
+    TRAILING_DAYS = 7
+
+    def refresh_statement_date(self, date):
+        """
+        Recompute the position statement rollups of one date, e.g. after a correction.
+        """
+        self.execute_statements([
+            (LOCK_ROLLUP_DATE, ("position_statements", date)),
+            (DELETE_STATEMENT_ROLLUP, (date,)),
+            (INSERT_STATEMENT_ROLLUP, (date,)),
+            (DELETE_STATEMENT_ASSET_CLASS_ROLLUP, (date,)),
+            (INSERT_STATEMENT_ASSET_CLASS_ROLLUP, (date,)),
+            (MARK_STATEMENT_REFRESHED, (date,)),
+        ])
+
+    def refresh_history_date(self, date):
+        """
+        Recompute the position history rollup of one date, e.g. after a correction.
+        """
+        self.execute_statements([
+            (LOCK_ROLLUP_DATE, ("position_history", date)),
+            (DELETE_HISTORY_ROLLUP, (date,)),
+            (INSERT_HISTORY_ROLLUP, (date,)),
+            (MARK_HISTORY_REFRESHED, (date,)),
+        ])
+
+    def refresh_pending(self, trailing_days=TRAILING_DAYS):
+        """
+        Build the rollups of every date that was never refreshed and rebuild the dates of the
+        last trailing_days days whose rows changed since their last refresh. Older corrections
+        are rebuilt with refresh_statement_date / refresh_history_date.
+        Returns the refreshed statement dates and history dates.
+        """
+        statement_dates = [row[0] for row in self.fetchall(PENDING_STATEMENT_DATES, (trailing_days,))]
+        for date in statement_dates:
+            self.refresh_statement_date(date)
+
+        history_dates = [row[0] for row in self.fetchall(PENDING_HISTORY_DATES, (trailing_days,))]
+        for date in history_dates:
+            self.refresh_history_date(date)
+
+        return statement_dates, history_dates
+
+    def get_dimensions(self):
+        """
+        Fetch every (source, asset_class, client_name, custodian_name) combination.
+        source is 'position_statements' or 'position_history'; history rows have no client or custodian.
+        """
+        return self.fetchall(DIMENSIONS)
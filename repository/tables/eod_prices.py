@@ -1,8 +1,65 @@
-class EodPrices:
+from repository.tables.base import PooledTable
+from repository.tables.statements import FilteredStatement, Statement
+from utils.symbology import TickerResolver
 
-    def __init__(self, conn):
-        self.conn = conn
-        self.cursor = conn.cursor()
+
+CLOSE_PRICE = Statement(
+    "eod_prices_close_price",
+    "SELECT ticker_id, close FROM eod_prices WHERE reporting_date = $1 AND ticker_id = $2",
+    ["date", "text"],
+)
+
+CLOSE_PRICES = Statement(
+    "eod_prices_close_prices",
+    "SELECT DISTINCT ON (ticker_id) ticker_id, close FROM eod_prices WHERE reporting_date = $1 ORDER BY ticker_id",
+    ["date"],
+)
+
+RECONCILIATION_COLUMNS = ["security_id", "isin", "ccy", "mtm_price", "close", "source_security_id"]
+
+
+def resolved_positions_sql(mapping_keys, mapping_values):
+    """
+    Return the mapping and positions CTEs shared by the reconciliation queries: the position
+    statements of $1, with {filters}, and their security ids resolved to eod ticker ids.
+    The ticker_mapping lookup is sent as the two array parameters mapping_keys and
+    mapping_values and the rest of TickerResolver.resolve runs in SQL.
+    """
+    return f"""
+    mapping AS (
+        SELECT * FROM unnest({mapping_keys}::text[], {mapping_values}::text[]) AS m(security_id, ticker_id)
+    ),
+    positions AS (
+        SELECT
+            ps.security_id AS source_security_id,
+            {TickerResolver.sql_expression("COALESCE(m.ticker_id, ps.security_id)")} AS security_id,
+            ps.isin, ps.ccy, ps.mtm_price
+        FROM position_statements ps
+        LEFT JOIN mapping m ON m.security_id = ps.security_id
+        WHERE ps.statement_date = $1{{filters}}
+    )"""
+
+
+RECONCILIATION_RECORDS = FilteredStatement(
+    "eod_prices_reconciliation_records",
+    "WITH" + resolved_positions_sql("$3", "$4") + """
+    SELECT p.security_id, p.isin, p.ccy, p.mtm_price, e.close, p.source_security_id
+    FROM positions p
+    LEFT JOIN LATERAL (
+        SELECT close FROM eod_prices
+        WHERE reporting_date = $1 AND ticker_id = p.security_id
+        LIMIT 1
+    ) e ON TRUE
+    WHERE e.close IS NULL
+       OR e.close = 0
+       OR p.mtm_price IS NULL
+       OR ABS(ROUND(((p.mtm_price - e.close) / NULLIF(e.close, 0) * 100)::numeric, 2)) >= $2
+    """,
+    ["date", "numeric", "text[]", "text[]"],
+    [("ps.asset_class", "text"), ("ps.client_name", "text"), ("ps.custodian_name", "text")],
+)
+
+class EodPrices(PooledTable):
 
     # Used to get ticker id and close from eod_prices table
     def get_records(self, date, security_id):
@@ -10,8 +67,38 @@ class EodPrices:
         Fetch and return the close price for a given date and security id.
         If no record is found, return 0.
         """
-        self.cursor.execute(
-            f"SELECT ticker_id, close FROM eod_prices WHERE reporting_date = '{date}' AND ticker_id = '{security_id}'"
-        )
-        record = self.cursor.fetchone()
+        record = self.fetchone(CLOSE_PRICE, (date, security_id))
         return record[1] if record else 0
+
+    def get_close_prices(self, date):
+        """
+        Fetch and return the close price of every ticker on date as a dict keyed by ticker id.
+        """
+        return dict(self.fetchall(CLOSE_PRICES, (date,)))
+
+    def get_reconciliation_records(self, date, asset_class, client_name, custodian_name, threshold, ticker_mapping):
+        """
+        Join the position statements of a date to their eod close in a single query.
+        Security ids are resolved as by TickerResolver.resolve: the ticker_mapping lookup
+        is sent as two arrays and the rest of the resolution runs in SQL.
+        Only rows that need attention come back: matched rows whose difference is at or
+        above the threshold or that have no mtm_price, and rows without a close (close is NULL).
+        Each row is (security_id, isin, ccy, mtm_price, close, source_security_id), where
+        source_security_id is the security id of the position statement before resolution.
+        """
+        statement, params = RECONCILIATION_RECORDS.bind(
+            [date, threshold, list(ticker_mapping.keys()), list(ticker_mapping.values())],
+            [asset_class, client_name, custodian_name],
+        )
+        return self.fetchall(statement, params)
+
+    def iter_reconciliation_records(self, date, asset_class, client_name, custodian_name, threshold, ticker_mapping, chunk_size=None):
+        """
+        Stream the rows of get_reconciliation_records from a server-side cursor as DataFrames
+        with the columns of RECONCILIATION_COLUMNS.
+        """
+        statement, params = RECONCILIATION_RECORDS.bind(
+            [date, threshold, list(ticker_mapping.keys()), list(ticker_mapping.values())],
+            [asset_class, client_name, custodian_name],
+        )
+        return self.stream(statement, params, RECONCILIATION_COLUMNS, chunk_size)
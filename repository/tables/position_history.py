@@ -1,30 +1,191 @@
-class PositionHistory:
+from repository.tables.base import PooledTable
+from repository.tables.daily_rollups import HISTORY_DATE_UNREFRESHED, UNREFRESHED_HISTORY_DATES
+from repository.tables.statements import Statement
 
-    def __init__(self, conn):
-        self.conn = conn
-        self.cursor = conn.cursor()
+
+UNIQUE_ASSET_CLASSES = Statement(
+    "position_history_unique_asset_classes",
+    "SELECT asset_class FROM position_history_rollup "
+    "UNION SELECT asset_class FROM position_history WHERE report_date IN (" + UNREFRESHED_HISTORY_DATES + ")",
+)
+
+# Read from the rollup, or from position_history while the date has no rollup.
+NET_WORTH = Statement(
+    "position_history_net_worth",
+    """
+    SELECT CASE WHEN """ + HISTORY_DATE_UNREFRESHED.format(date="$1") + """
+                THEN (SELECT SUM(mtm_rpt_ccy) FROM position_history WHERE report_date = $1 AND asset_class = $2)
+                ELSE (SELECT SUM(total_mtm_rpt_ccy) FROM position_history_rollup WHERE report_date = $1 AND asset_class = $2)
+           END
+    """,
+    ["date", "text"],
+)
+
+RECORDS = Statement(
+    "position_history_records",
+    "SELECT security_id, SUM(mtm_rpt_ccy), SUM(position_qty), SUM(mtm_price) FROM position_history WHERE report_date = $1 AND asset_class = $2 GROUP BY security_id",
+    ["date", "text"],
+)
+
+RECORD_COLUMNS = ["security_id", "mtm_rpt_ccy", "position_qty", "mtm_price"]
+
+# Both dates of a comparison in one query. The 'date' row carries the two net worths and
+# their percentage change (NULL when the previous net worth is zero). Only when that change
+# is above the threshold $4 are the per-security aggregates of both dates added side by side
+# as 'security' rows, one per security of the current date; a security missing on the
+# previous date gets zeros. The net worths are summed from the same per-security aggregates
+# as the 'security' rows, as RANGE_CHANGES does, so totals and details always agree.
+COMPARISON = Statement(
+    "position_history_comparison",
+    """
+    WITH current_values AS (
+        SELECT security_id, SUM(mtm_rpt_ccy) AS mtm_rpt_ccy, SUM(position_qty) AS position_qty, SUM(mtm_price) AS mtm_price
+        FROM position_history
+        WHERE report_date = $1 AND asset_class = $3
+        GROUP BY security_id
+    ),
+    previous_values AS (
+        SELECT security_id, SUM(mtm_rpt_ccy) AS mtm_rpt_ccy, SUM(position_qty) AS position_qty, SUM(mtm_price) AS mtm_price
+        FROM position_history
+        WHERE report_date = $2 AND asset_class = $3
+        GROUP BY security_id
+    ),
+    totals AS (
+        SELECT ROUND(COALESCE((SELECT SUM(mtm_rpt_ccy) FROM current_values), 0)::numeric, 4) AS net_worth,
+               ROUND(COALESCE((SELECT SUM(mtm_rpt_ccy) FROM previous_values), 0)::numeric, 4) AS previous_net_worth
+    ),
+    net_worth_change AS (
+        SELECT net_worth, previous_net_worth,
+               CASE WHEN previous_net_worth <> 0
+                    THEN ROUND((net_worth - previous_net_worth) / previous_net_worth * 100, 2)
+               END AS change
+        FROM totals
+    )
+    SELECT 'date' AS level, NULL::text AS security_id,
+           previous_net_worth, NULL::numeric, NULL::numeric,
+           net_worth, NULL::numeric, NULL::numeric, change
+    FROM net_worth_change
+    UNION ALL
+    SELECT 'security', c.security_id,
+           COALESCE(p.mtm_rpt_ccy, 0), COALESCE(p.position_qty, 0), COALESCE(p.mtm_price, 0),
+           c.mtm_rpt_ccy, c.position_qty, c.mtm_price, NULL
+    FROM current_values c
+    LEFT JOIN previous_values p ON p.security_id = c.security_id
+    WHERE (SELECT ABS(change) > $4 FROM net_worth_change)
+    """,
+    ["date", "date", "text", "numeric"],
+)
+
+COMPARISON_COLUMNS = [
+    "level", "security_id",
+    "previous_mtm_rpt_ccy", "previous_position_qty", "previous_mtm_price",
+    "mtm_rpt_ccy", "position_qty", "mtm_price", "change",
+]
+
+# Day-over-day changes for every report date in [$1, $2], each compared with the
+# previous available report date. Date rows carry the net worth of every date;
+# security rows are only returned when their change is above the threshold $4.
+RANGE_CHANGES = Statement(
+    "position_history_range_changes",
+    """
+    WITH securities AS (
+        SELECT report_date, security_id, SUM(mtm_rpt_ccy) AS mtm_rpt_ccy, SUM(position_qty) AS position_qty, SUM(mtm_price) AS mtm_price
+        FROM position_history
+        WHERE asset_class = $3
+          AND report_date <= $2
+          AND report_date >= COALESCE(
+              (SELECT MAX(report_date) FROM position_history WHERE asset_class = $3 AND report_date < $1), $1
+          )
+        GROUP BY report_date, security_id
+    ),
+    dates AS (
+        SELECT report_date,
+               LAG(report_date) OVER (ORDER BY report_date) AS previous_date,
+               ROUND(SUM(mtm_rpt_ccy)::numeric, 4) AS net_worth,
+               LAG(ROUND(SUM(mtm_rpt_ccy)::numeric, 4)) OVER (ORDER BY report_date) AS previous_net_worth
+        FROM securities
+        GROUP BY report_date
+    ),
+    security_changes AS (
+        SELECT s.report_date, d.previous_date, s.security_id,
+               s.mtm_rpt_ccy, s.position_qty, s.mtm_price,
+               LAG(s.report_date) OVER w AS security_previous_date,
+               LAG(s.mtm_rpt_ccy) OVER w AS previous_mtm_rpt_ccy,
+               LAG(s.position_qty) OVER w AS previous_position_qty,
+               LAG(s.mtm_price) OVER w AS previous_mtm_price
+        FROM securities s
+        JOIN dates d ON d.report_date = s.report_date
+        WINDOW w AS (PARTITION BY s.security_id ORDER BY s.report_date)
+    )
+    SELECT 'date' AS level, report_date, previous_date, NULL::text AS security_id,
+           NULL AS previous_position_qty, NULL AS previous_mtm_price, previous_net_worth AS previous_mtm_rpt_ccy,
+           NULL AS position_qty, NULL AS mtm_price, net_worth AS mtm_rpt_ccy,
+           CASE WHEN previous_net_worth <> 0
+                THEN ROUND((net_worth - previous_net_worth) / previous_net_worth * 100, 2)
+           END AS change
+    FROM dates
+    WHERE report_date >= $1
+    UNION ALL
+    SELECT 'security', report_date, previous_date, security_id,
+           previous_position_qty, previous_mtm_price, previous_mtm_rpt_ccy,
+           position_qty, mtm_price, mtm_rpt_ccy,
+           ROUND(((mtm_rpt_ccy - previous_mtm_rpt_ccy) / previous_mtm_rpt_ccy * 100)::numeric, 2)
+    FROM security_changes
+    WHERE report_date >= $1
+      AND security_previous_date = previous_date
+      AND previous_mtm_rpt_ccy <> 0
+      AND ABS(ROUND(((mtm_rpt_ccy - previous_mtm_rpt_ccy) / previous_mtm_rpt_ccy * 100)::numeric, 2)) > $4
+    ORDER BY report_date, level, security_id
+    """,
+    ["date", "date", "text", "numeric"],
+)
+
+
+class PositionHistory(PooledTable):
 
     def get_unique_asset_classes(self):
         """
         This function returns a list of distinct asset classes from the position history.
         """
-        self.cursor.execute("SELECT DISTINCT asset_class FROM position_history")
-        asset_classes = [row[0] for row in self.cursor.fetchall()]
+        asset_classes = [row[0] for row in self.fetchall(UNIQUE_ASSET_CLASSES)]
         return asset_classes
 
     def get_net_worth(self, date, asset_class):
         """
         This function returns the net worth for a given date and asset class.
+        The total is read from position_history_rollup, or from position_history while the
+        date has no rollup.
         """
-        self.cursor.execute(f"SELECT SUM(mtm_rpt_ccy) FROM position_history WHERE report_date = '{date}' AND asset_class = '{asset_class}'")
-        record = self.cursor.fetchone()
+        record = self.fetchone(NET_WORTH, (date, asset_class))
         return round(record[0], 4) if record[0] else 0
 
     def get_records(self, date, asset_class):
         """
         This function fetches the records from the position history for a given date and asset class.
         """
-        self.cursor.execute(
-            f"SELECT security_id, SUM(mtm_rpt_ccy), SUM(position_qty), SUM(mtm_price) FROM position_history WHERE report_date = '{date}' AND asset_class = '{asset_class}' GROUP BY security_id"
-        )
-        return self.cursor.fetchall()
\ No newline at end of file
+        return self.fetchall(RECORDS, (date, asset_class))
+
+    def iter_records(self, date, asset_class, chunk_size=None):
+        """
+        This function streams the records of get_records from a server-side cursor as DataFrames
+        with the columns security_id, mtm_rpt_ccy, position_qty and mtm_price.
+        """
+        return self.stream(RECORDS, (date, asset_class), RECORD_COLUMNS, chunk_size)
+
+    def iter_comparison(self, current_date, previous_date, asset_class, threshold, chunk_size=None):
+        """
+        This function streams the comparison of two dates in one query as DataFrames with the columns
+        of COMPARISON_COLUMNS: a 'date' row with both net worths and their change, followed by the
+        per-security values of both dates side by side when the change is above the threshold.
+        """
+        return self.stream(COMPARISON, (current_date, previous_date, asset_class, threshold), COMPARISON_COLUMNS, chunk_size)
+
+    def get_range_changes(self, start_date, end_date, asset_class, threshold):
+        """
+        This function returns the day-over-day changes between start_date and end_date in one query.
+        Each date is compared with the previous available report date, so weekends and holidays are skipped.
+        Rows are (level, report_date, previous_date, security_id, previous_position_qty, previous_mtm_price,
+        previous_mtm_rpt_ccy, position_qty, mtm_price, mtm_rpt_ccy, change) where level is 'date' for the
+        net worth of every date and 'security' for securities whose change is above the threshold.
+        """
+        return self.fetchall(RANGE_CHANGES, (start_date, end_date, asset_class, threshold))
\ No newline at end of file
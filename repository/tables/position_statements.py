@@ -1,58 +1,158 @@
-class PositionStatements: 
+from repository.tables.base import PooledTable
+from repository.tables.daily_rollups import STATEMENT_DATE_UNREFRESHED, UNREFRESHED_STATEMENT_DATES
+from repository.tables.statements import FilteredStatement, Statement
 
-    def __init__(self, conn):
-        self.conn = conn
-        self.cursor = conn.cursor()
+
+UNIQUE_ASSET_CLASSES = Statement(
+    "position_statements_unique_asset_classes",
+    "SELECT asset_class FROM position_statement_rollup "
+    "UNION SELECT asset_class FROM position_statements WHERE statement_date IN (" + UNREFRESHED_STATEMENT_DATES + ")",
+)
+
+UNIQUE_CLIENT_NAMES = Statement(
+    "position_statements_unique_client_names",
+    "SELECT client_name FROM position_statement_rollup "
+    "UNION SELECT client_name FROM position_statements WHERE statement_date IN (" + UNREFRESHED_STATEMENT_DATES + ")",
+)
+
+UNIQUE_CUSTODIAN_NAMES = Statement(
+    "position_statements_unique_custodian_names",
+    "SELECT custodian_name FROM position_statement_rollup "
+    "UNION SELECT custodian_name FROM position_statements WHERE statement_date IN (" + UNREFRESHED_STATEMENT_DATES + ")",
+)
+
+RECORD_COLUMNS = ["security_id", "mtm_price", "isin", "ccy"]
+
+RECORDS = FilteredStatement(
+    "position_statements_records",
+    "SELECT security_id, mtm_price, isin, ccy FROM position_statements WHERE statement_date = $1{filters}",
+    ["date"],
+    [("asset_class", "text"), ("client_name", "text"), ("custodian_name", "text")],
+)
+
+RECORD_COUNT = FilteredStatement(
+    "position_statements_record_count",
+    "SELECT COUNT(*) FROM position_statements WHERE statement_date = $1{filters}",
+    ["date"],
+    [("asset_class", "text"), ("client_name", "text"), ("custodian_name", "text")],
+)
+
+# Read from position_statements itself, an index-only scan of the date's filter columns,
+# so a date is fanned out even before its rollup is built or after it was corrected.
+FILTER_COMBINATIONS = Statement(
+    "position_statements_filter_combinations",
+    """
+    SELECT DISTINCT asset_class, client_name, custodian_name
+    FROM position_statements
+    WHERE statement_date = $1
+    ORDER BY 1, 2, 3
+    """,
+    ["date"],
+)
+
+# Dates without a rollup yet are aggregated from position_statements instead.
+ASSET_CLASS_RECORDS = Statement(
+    "position_statements_asset_class_records",
+    """
+    SELECT asset_class, total_mtm_rpt_ccy FROM position_statement_asset_class_rollup WHERE statement_date = $1
+    UNION ALL
+    SELECT asset_class, SUM(mtm_rpt_ccy)
+    FROM position_statements
+    WHERE statement_date = $1 AND """ + STATEMENT_DATE_UNREFRESHED.format(date="$1") + """
+    GROUP BY asset_class
+    """,
+    ["date"],
+)
+
+
+ASSET_CLASS_RECORDS_FOR_DATES = Statement(
+    "position_statements_asset_class_records_for_dates",
+    """
+    SELECT statement_date, asset_class, total_mtm_rpt_ccy
+    FROM position_statement_asset_class_rollup
+    WHERE statement_date = ANY($1)
+    UNION ALL
+    SELECT statement_date, asset_class, SUM(mtm_rpt_ccy)
+    FROM position_statements
+    WHERE statement_date = ANY(ARRAY(
+        SELECT unnest($1)
+        EXCEPT
+        SELECT rollup_date FROM rollup_refreshes WHERE rollup_name = 'position_statements'
+    ))
+    GROUP BY statement_date, asset_class
+    ORDER BY statement_date, asset_class
+    """,
+    ["date[]"],
+)
+
+
+class PositionStatements(PooledTable):
 
     def get_unique_asset_classes(self):
         """
-        Fetch and return distinct asset classes from the database.
+        Fetch and return distinct asset classes from the rollup and from dates without one.
         """
-        self.cursor.execute("SELECT DISTINCT asset_class FROM position_statements")
-        asset_classes = [row[0] for row in self.cursor.fetchall()]
+        asset_classes = [row[0] for row in self.fetchall(UNIQUE_ASSET_CLASSES)]
         return asset_classes
     
     def get_unique_client_name(self):
         """
-        Fetch and return distinct client names from the database.
+        Fetch and return distinct client names from the rollup and from dates without one.
         """
-        self.cursor.execute("SELECT DISTINCT client_name FROM position_statements")
-        client_names = [row[0] for row in self.cursor.fetchall()]
+        client_names = [row[0] for row in self.fetchall(UNIQUE_CLIENT_NAMES)]
         return client_names
     
     def get_unique_custodian_name(self):
         """
-        Fetch and return distinct custodian names from the database.
+        Fetch and return distinct custodian names from the rollup and from dates without one.
         """
-        self.cursor.execute("SELECT DISTINCT custodian_name FROM position_statements")
-        custodian_names = [row[0] for row in self.cursor.fetchall()]
+        custodian_names = [row[0] for row in self.fetchall(UNIQUE_CUSTODIAN_NAMES)]
         return custodian_names
     
     def get_records(self, date, asset_class, client_name, custodian_name):
         """
         Fetch and return security id and mtm_price based on the provided date, 
         asset class, client name, and custodian name from the database.
+        Filters set to "All" select a prepared variant without that condition and
+        filters set to None one that matches NULL.
         """
-        query = f"SELECT security_id, mtm_price, isin, ccy from position_statements WHERE statement_date = '{date}'"
-        conditions = []
-
-        if asset_class != "All":
-            conditions.append(f"asset_class = '{asset_class}'")
-
-        if client_name != "All":
-            conditions.append(f"client_name = '{client_name}'")
+        statement, params = RECORDS.bind([date], [asset_class, client_name, custodian_name])
+        return self.fetchall(statement, params)
+    
+    def count_records(self, date, asset_class, client_name, custodian_name):
+        """
+        Count the positions of get_records straight from position_statements.
+        """
+        statement, params = RECORD_COUNT.bind([date], [asset_class, client_name, custodian_name])
+        return self.fetchone(statement, params)[0]
 
-        if custodian_name != "All":
-            conditions.append(f"custodian_name = '{custodian_name}'")
+    def iter_records(self, date, asset_class, client_name, custodian_name, chunk_size=None):
+        """
+        Stream the rows of get_records from a server-side cursor as DataFrames
+        with the columns security_id, mtm_price, isin and ccy.
+        """
+        statement, params = RECORDS.bind([date], [asset_class, client_name, custodian_name])
+        return self.stream(statement, params, RECORD_COLUMNS, chunk_size)
 
-        if conditions:
-            query += " AND " + " AND ".join(conditions)
+    def get_filter_combinations(self, date):
+        """
+        Fetch and return the (asset_class, client_name, custodian_name) combinations
+        that have positions on date, from position_statements. A missing dimension is None,
+        which the record queries match with IS NULL.
+        """
+        return self.fetchall(FILTER_COMBINATIONS, (date,))
 
-        self.cursor.execute(query)
-        return self.cursor.fetchall()
-    
     def get_asset_class_records(self, date):
-        query = f"SELECT asset_class, SUM(mtm_rpt_ccy) as total_mtm_rpt_ccy FROM position_statements WHERE statement_date = '{date}' GROUP BY asset_class"
-        self.cursor.execute(query)
-        return self.cursor.fetchall()
+        """
+        Fetch and return the total mtm_rpt_ccy per asset class for a date from the rollup table,
+        or from position_statements while the date has no rollup.
+        """
+        return self.fetchall(ASSET_CLASS_RECORDS, (date,))
 
+    def get_asset_class_records_for_dates(self, dates):
+        """
+        Fetch and return (statement_date, asset_class, total_mtm_rpt_ccy) for every date in dates
+        in one query against the rollup table; dates without a rollup are aggregated from
+        position_statements.
+        """
+        return self.fetchall(ASSET_CLASS_RECORDS_FOR_DATES, (list(dates),))
@@ -0,0 +1,159 @@
+import json
+from repository.tables.base import PooledTable
+from repository.tables.eod_prices import resolved_positions_sql
+from repository.tables.statements import FilteredStatement, Statement
+
+
+LOCK_RUN = Statement(
+    "reconciliation_rows_lock_run",
+    "SELECT pg_advisory_xact_lock(hashtext($1))",
+    ["text"],
+)
+
+# Brings the stored rows of run $4 in line with the position statements of $1 in one statement.
+# Rows are grouped by an md5 of their inputs (custodian security id, resolved ticker, isin,
+# ccy, mtm_price and the matched close) with the number of positions sharing it. Stored rows
+# whose hash is gone are deleted, new hashes are inserted with their price difference, and
+# a hash whose position count changed is updated; unchanged rows are neither written nor sent.
+# Returns the number of positions and the number of positions that were (re)compared.
+SYNC = FilteredStatement(
+    "reconciliation_rows_sync",
+    "WITH" + resolved_positions_sql("$2", "$3") + """,
+    closes AS (
+        SELECT DISTINCT ON (ticker_id) ticker_id, close
+        FROM eod_prices
+        WHERE reporting_date = $1
+        ORDER BY ticker_id
+    ),
+    priced AS (
+        SELECT md5(ROW(p.source_security_id, p.security_id, p.isin, p.ccy, p.mtm_price, e.close)::text) AS row_hash,
+               p.security_id, p.isin, p.ccy, p.mtm_price, e.close, p.source_security_id
+        FROM positions p
+        LEFT JOIN closes e ON e.ticker_id = p.security_id
+    ),
+    grouped AS (
+        SELECT row_hash, COUNT(*) AS positions, security_id, isin, ccy, mtm_price, close, source_security_id
+        FROM priced
+        GROUP BY row_hash, security_id, isin, ccy, mtm_price, close, source_security_id
+    ),
+    removed AS (
+        DELETE FROM reconciliation_rows s
+        WHERE s.run_key = $4
+          AND NOT EXISTS (SELECT 1 FROM grouped g WHERE g.row_hash = s.row_hash)
+        RETURNING s.row_hash
+    ),
+    changed AS (
+        INSERT INTO reconciliation_rows
+            (run_key, statement_date, row_hash, positions, security_id, isin, ccy, mtm_price, close, source_security_id, difference, matched)
+        SELECT $4, $1, g.row_hash, g.positions, g.security_id, g.isin, g.ccy, g.mtm_price, g.close, g.source_security_id,
+               COALESCE(ROUND(((g.mtm_price - g.close) / NULLIF(g.close, 0) * 100)::numeric, 2), 0),
+               COALESCE(g.close, 0) <> 0
+        FROM grouped g
+        WHERE NOT EXISTS (
+            SELECT 1 FROM reconciliation_rows s
+            WHERE s.run_key = $4 AND s.row_hash = g.row_hash AND s.positions = g.positions
+        )
+        ON CONFLICT (run_key, row_hash) DO UPDATE SET positions = EXCLUDED.positions
+        RETURNING positions
+    )
+    SELECT (SELECT COALESCE(SUM(positions), 0) FROM grouped),
+           (SELECT COALESCE(SUM(positions), 0) FROM changed),
+           (SELECT COUNT(*) FROM removed)
+    """,
+    ["date", "text[]", "text[]", "text"],
+    [("ps.asset_class", "text"), ("ps.client_name", "text"), ("ps.custodian_name", "text")],
+)
+
+# The stored rows of run $1 that need attention at threshold $2, one row per position:
+# matched rows at or above the threshold or without an mtm_price, and rows without a close
+# whose isin is not '0'. Their vendor verdict from an earlier run comes along.
+EXCEPTIONS = Statement(
+    "reconciliation_rows_exceptions",
+    """
+    SELECT s.row_hash, s.security_id, s.isin, s.ccy, s.mtm_price, COALESCE(s.close, 0), s.difference, s.matched,
+           s.source_security_id, s.resolved_by
+    FROM reconciliation_rows s
+    CROSS JOIN generate_series(1, s.positions)
+    WHERE s.run_key = $1
+      AND CASE WHEN s.matched THEN ABS(s.difference) >= $2 OR s.mtm_price IS NULL
+               ELSE s.isin IS DISTINCT FROM '0'
+          END
+    ORDER BY s.security_id, s.row_hash
+    """,
+    ["text", "numeric"],
+)
+
+EXCEPTION_COLUMNS = [
+    "row_hash", "security_id", "isin", "ccy", "mtm_price", "close", "difference", "matched",
+    "source_security_id", "resolved_by",
+]
+
+SAVE_VERDICTS = Statement(
+    "reconciliation_rows_save_verdicts",
+    """
+    UPDATE reconciliation_rows s
+    SET resolved_by = v.resolved_by
+    FROM unnest($2::text[], $3::text[]) AS v(row_hash, resolved_by)
+    WHERE s.run_key = $1 AND s.row_hash = v.row_hash
+    """,
+    ["text", "text[]", "text[]"],
+)
+
+PURGE = Statement(
+    "reconciliation_rows_purge",
+    "WITH removed AS (DELETE FROM reconciliation_rows RETURNING 1) SELECT COUNT(*) FROM removed",
+)
+
+PURGE_DATE = Statement(
+    "reconciliation_rows_purge_date",
+    "WITH removed AS (DELETE FROM reconciliation_rows WHERE statement_date = $1 RETURNING 1) SELECT COUNT(*) FROM removed",
+    ["date"],
+)
+
+
+class ReconciliationRows(PooledTable):
+    """
+    Server-side record of the last position statement reconciliation per (statement date, filters).
+    Every distinct position row is kept under the hash of its inputs with its price difference,
+    whether a close price matched and, once searched, the vendor verdict of an unidentified ticker,
+    so a later run only compares the rows whose hash is new and reuses the stored outcome of the others.
+    """
+
+    @staticmethod
+    def run_key(date, asset_class, client_name, custodian_name):
+        return json.dumps([str(date), asset_class, client_name, custodian_name])
+
+    def sync(self, run_key, date, asset_class, client_name, custodian_name, ticker_mapping):
+        """
+        Bring the stored rows of run_key in line with the position statements of date and return
+        (positions, compared, removed): the number of positions, of positions whose row was new or
+        changed and of stored rows that were dropped. Runs of the same key are serialized.
+        """
+        statement, params = SYNC.bind(
+            [date, list(ticker_mapping.keys()), list(ticker_mapping.values()), run_key],
+            [asset_class, client_name, custodian_name],
+        )
+        positions, compared, removed = self.execute_statements([(LOCK_RUN, (run_key,)), (statement, params)])[0]
+        return int(positions), int(compared), int(removed)
+
+    def iter_exceptions(self, run_key, threshold, chunk_size=None):
+        """
+        Stream the stored rows of run_key that need attention at threshold as DataFrames with
+        the columns of EXCEPTION_COLUMNS.
+        """
+        return self.stream(EXCEPTIONS, (run_key, threshold), EXCEPTION_COLUMNS, chunk_size)
+
+    def save_verdicts(self, run_key, verdicts):
+        """
+        Store the vendor verdict of unidentified rows, given as a dict of row hash to verdict.
+        """
+        if verdicts:
+            self.execute_statements([(SAVE_VERDICTS, (run_key, list(verdicts.keys()), list(verdicts.values())))])
+
+    def purge(self, date=None):
+        """
+        Remove the stored runs of a statement date, or of every date; return the number of rows removed.
+        """
+        if date is None:
+            return self.execute_statements([(PURGE, ())])[0][0]
+        return self.execute_statements([(PURGE_DATE, (date,))])[0][0]
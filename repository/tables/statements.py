@@ -0,0 +1,88 @@
+import re
+from itertools import product
+
+
+ALL = "All"
+
+PARAMETER = re.compile(r"\$(\d+)")
+
+
+class Statement:
+
+    def __init__(self, name, sql, arg_types=()):
+        """
+        A named query with $1..$n bound parameters of the given Postgres types.
+        """
+        self.name = name
+        self.sql = sql
+        self.arg_types = tuple(arg_types)
+
+    def prepare_sql(self):
+        """
+        Return the PREPARE command that registers this statement on a connection.
+        """
+        if not self.arg_types:
+            return f"PREPARE {self.name} AS {self.sql}"
+        return f"PREPARE {self.name} ({', '.join(self.arg_types)}) AS {self.sql}"
+
+    def execute_sql(self):
+        """
+        Return the EXECUTE command with psycopg2 placeholders for the bound values.
+        """
+        if not self.arg_types:
+            return f"EXECUTE {self.name}"
+        return f"EXECUTE {self.name} ({', '.join(['%s'] * len(self.arg_types))})"
+
+    def cursor_sql(self):
+        """
+        Return the query with $n replaced by named psycopg2 placeholders cast to the argument
+        types, for server-side cursors: DECLARE cannot run a prepared statement.
+        """
+        sql = self.sql.replace("%", "%%")
+        return PARAMETER.sub(lambda match: f"%(p{match.group(1)})s::{self.arg_types[int(match.group(1)) - 1]}", sql)
+
+    @staticmethod
+    def cursor_params(params):
+        """
+        Return params keyed by the placeholder names used in cursor_sql.
+        """
+        return {f"p{position}": value for position, value in enumerate(params, start=1)}
+
+
+class FilteredStatement:
+
+    # Per filter: no condition for "All", "column = $n" for a value and "column IS NULL" for None.
+    STATES = ("0", "1", "n")
+
+    def __init__(self, name, sql, arg_types, filters):
+        """
+        A query with optional equality filters that may be set to "All" or to None.
+        sql contains a {filters} placeholder and uses $1..$n for the fixed arguments.
+        filters is a list of (column, type); one prepared variant is built for every
+        combination of filter states, so the set of server-side plans stays fixed.
+        """
+        self.name = name
+        self.variants = {}
+        for mask in product(self.STATES, repeat=len(filters)):
+            variant_types = list(arg_types)
+            conditions = []
+            for state, (column, column_type) in zip(mask, filters):
+                if state == "1":
+                    variant_types.append(column_type)
+                    conditions.append(f" AND {column} = ${len(variant_types)}")
+                elif state == "n":
+                    conditions.append(f" AND {column} IS NULL")
+            self.variants[mask] = Statement(f"{name}_{''.join(mask)}", sql.format(filters="".join(conditions)), variant_types)
+
+    @staticmethod
+    def state(value):
+        if value is None:
+            return "n"
+        return "0" if value == ALL else "1"
+
+    def bind(self, args, filter_values):
+        """
+        Pick the variant for filter_values and return it with the full argument list.
+        """
+        mask = tuple(self.state(value) for value in filter_values)
+        return self.variants[mask], list(args) + [value for value, state in zip(filter_values, mask) if state == "1"]
@@ -0,0 +1,17 @@
+from repository.tables.base import PooledTable
+from repository.tables.statements import Statement
+
+
+RECORDS = Statement(
+    "ticker_mappings_records",
+    "SELECT security_id, ticker_id FROM ticker_mapping",
+)
+
+
+class TickerMappings(PooledTable):
+
+    def get_records(self):
+        """
+        Fetch and return the custodian security id to ticker id mappings as a dict.
+        """
+        return {security_id: ticker_id for security_id, ticker_id in self.fetchall(RECORDS)}
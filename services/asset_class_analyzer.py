@@ -1,79 +1,142 @@
 import pandas as pd
-import streamlit as st
+from services.results import AssetClassBatchResult, AssetClassResult
 from utils.mapping import asset_map
+from utils.report_reader import ReportReader
 
 
-class AssetClassAnalyzer:
-
-    def __init__(self, position_statements):
-        self.position_statements = position_statements
+# Case-insensitive lookup from a report type prefix to its asset class
+ASSET_MAP_LOWER = {k.lower(): v for k, v in asset_map.items()}
 
-    def process_json(self, json_data):
-        # Convert JSON data to pandas DataFrame
-        df = pd.DataFrame(json_data["Data"])
-        
-        # Make the mapping case insensitive by converting all keys in asset_map to lower case
-        asset_map_lower = {k.lower(): v for k, v in asset_map.items()}
-
-        # Create a function to implement the mapping
-        def map_type(value):
-            if value is not None and '&' in value:
-                asset_class = value.split('&')[0].strip().lower()  # Convert to lower case for case-insensitive comparison
-                return asset_map_lower.get(asset_class, None)
-            return None
+NET_WORTH_TABLE = "Net Worth"
 
-        # Apply the function to the 'Type' column
-        df['Type'] = df['Type'].apply(map_type)
 
-        # Drop rows where 'Type' is None
-        df.dropna(subset=['Type'], inplace=True)
-        df.reset_index(inplace=True, drop=True)
+class AssetClassAnalyzer:
 
-        # Convert 'Total' column to numeric
-        df['Total'] = df['Total'].str.replace(',', '').apply(pd.to_numeric, errors='coerce')
+    def __init__(self, position_statements):
+        self.position_statements = position_statements
 
-        # Calculate the total value
-        total_value = df['Total'].sum()
+    @staticmethod
+    def map_types(types):
+        """
+        Map report types such as "Equity & Stocks" to asset classes in one vectorized pass.
+        The part before '&' is looked up case-insensitively; types without '&' map to None.
+        """
+        types = pd.Series(types, dtype=object)
+        prefixes = types.str.split("&", n=1).str[0].str.strip().str.lower()
+        return prefixes.where(types.str.contains("&", regex=False, na=False)).map(ASSET_MAP_LOWER)
+
+    @staticmethod
+    def parse_totals(totals):
+        """
+        Parse totals such as "1,234.50" to numbers; values that do not parse become NaN.
+        """
+        return pd.to_numeric(pd.Series(totals, dtype=object).astype(str).str.replace(",", "", regex=False), errors="coerce")
+
+    def process_batches(self, batches):
+        """
+        Map and parse each batch of report rows as it arrives and return the rows with an
+        asset class, followed by a 'Total Value' row.
+        """
+        frames = []
+        for rows in batches:
+            df = pd.DataFrame(rows)
+            df['Type'] = self.map_types(df['Type'])
+
+            # Drop rows where 'Type' is None
+            df = df.dropna(subset=['Type'])
+            df['Total'] = self.parse_totals(df['Total'])
+            frames.append(df)
+
+        df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=['Type', 'Total'])
 
         # Create a DataFrame for the total row
-        total_df = pd.DataFrame({'Type': ['Total Value'], 'Total': [total_value]})
+        total_df = pd.DataFrame({'Type': ['Total Value'], 'Total': [df['Total'].sum()]})
 
         # Concatenate the original DataFrame with the total row DataFrame
         df = pd.concat([df, total_df], ignore_index=True)
         df.rename(columns={'Type': 'Asset class'}, inplace=True)
         return df
-    
-
-    def run(self, json_data, date):
-
-        df_processed = self.process_json(json_data)
-
-        query_result = self.position_statements.get_asset_class_records(date)
-
-        st.title("JSON Data")
-        st.dataframe(df_processed, use_container_width=True)
-
-        # Convert the query result to a DataFrame
-        df_query = pd.DataFrame(query_result, columns=['Asset class', 'Total'])
-
-        # Round the 'Value' column to 4 decimal places
-        df_query['Total'] = df_query['Total'].round(4)
 
-        st.title("Position Statement Data")
-        st.dataframe(df_query, use_container_width=True)
+    def process_json(self, json_data):
+        return self.process_batches([json_data["Data"]])
+
+    def process_report(self, report):
+        """
+        Process a ReportReader, raising ValueError unless it is a Net Worth report.
+        """
+        df = self.process_batches(report.batches())
+        if report.fields.get("Table Name") != NET_WORTH_TABLE:
+            raise ValueError(f"Expected a '{NET_WORTH_TABLE}' table, got {report.fields.get('Table Name')!r}.")
+        return df
 
-        # Merge df_processed and df_query on 'Asset class'
-        df_merged = pd.merge(df_processed, df_query, on='Asset class', how='outer', suffixes=('_processed', '_query'))
+    def load_report(self, json_data):
+        """
+        Process json_data, which is either the parsed report or a ReportReader that is processed batch by batch.
+        """
+        if isinstance(json_data, ReportReader):
+            return self.process_report(json_data)
+        return self.process_json(json_data)
+
+    @staticmethod
+    def merge_totals(df_processed, df_query, on):
+        """
+        Merge report totals with position statement totals on the on columns and add the percentage difference.
+        Rows missing on either side are dropped.
+        """
+        df_merged = pd.merge(df_processed, df_query, on=on, how='outer', suffixes=('_processed', '_query'))
 
         # Calculate the percentage difference
         df_merged['Percentage Difference'] = ((df_merged['Total_processed'] - df_merged['Total_query']) / df_merged['Total_query']) * 100
 
-        # Fill NaNs with 0
-        df_merged.dropna(inplace=True)
+        df_merged = df_merged.dropna(subset=['Total_processed', 'Total_query', 'Percentage Difference']).reset_index(drop=True)
 
         # Round 'Percentage Difference' to 2 decimal places
         df_merged['Percentage Difference'] = df_merged['Percentage Difference'].round(2)
+        return df_merged
+
+    def analyze(self, json_data, date):
+        """
+        Compare the asset class totals of a Net Worth report with the position statement totals of date.
+        json_data is either the parsed report or a ReportReader, which is processed batch by batch.
+        """
+        result = AssetClassResult(date)
+        df_processed = self.load_report(json_data)
 
-        st.title("Difference between JSON and Position Statement")
-        st.dataframe(df_merged, use_container_width=True)
+        query_result = self.position_statements.get_asset_class_records(date)
+
+        # Convert the query result to a DataFrame
+        df_query = pd.DataFrame(query_result, columns=['Asset class', 'Total'])
+
+        # Round the 'Value' column to 4 decimal places
+        df_query['Total'] = df_query['Total'].round(4)
 
+        result.json_data = df_processed
+        result.position_statement = df_query
+        result.differences = self.merge_totals(df_processed, df_query, on='Asset class')
+        return result
+
+    def analyze_many(self, reports):
+        """
+        Compare many Net Worth reports in one pass. reports is a list of (name, date, json_data);
+        the position statement totals of all dates are fetched with one query and the
+        differences of every report are returned in a single table with Report and Date columns.
+        """
+        dates = sorted({date for _, date, _ in reports})
+        result = AssetClassBatchResult(dates)
+
+        frames = []
+        for name, date, json_data in reports:
+            df_processed = self.load_report(json_data)
+            df_processed.insert(0, 'Date', date)
+            df_processed.insert(0, 'Report', name)
+            frames.append(df_processed)
+        df_processed = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=['Report', 'Date', 'Asset class', 'Total'])
+
+        query_result = self.position_statements.get_asset_class_records_for_dates(dates)
+        df_query = pd.DataFrame(query_result, columns=['Date', 'Asset class', 'Total'])
+        df_query['Total'] = pd.to_numeric(df_query['Total']).round(4)
+
+        result.json_data = df_processed
+        result.position_statement = df_query
+        result.differences = self.merge_totals(df_processed, df_query, on=['Date', 'Asset class'])
+        return result
@@ -0,0 +1,195 @@
+import os
+import json
+import argparse
+from contextlib import ExitStack
+from datetime import date, timedelta
+import pandas as pd
+from dotenv import load_dotenv
+from database.database_connector import env_db_config, get_pool
+from repository.tables.eod_prices import EodPrices
+from repository.tables.position_history import PositionHistory
+from repository.tables.position_statements import PositionStatements
+from repository.tables.statements import ALL
+from repository.tables.ticker_mappings import TickerMappings
+from services.asset_class_analyzer import AssetClassAnalyzer
+from services.fan_out import FanOutReconciler
+from services.position_history_analyzer import PositionHistoryAnalyzer
+from services.position_statement_analyzer import PositionStatementAnalyzer
+from utils.metrics import start_run
+from utils.report_reader import ReportReader
+
+
+DEFAULT_OUTPUT_DIR = "reports"
+
+
+def date_range(start_date, end_date):
+    """
+    Return every calendar date from start_date to end_date inclusive.
+    """
+    return [start_date + timedelta(days=offset) for offset in range((end_date - start_date).days + 1)]
+
+
+def write_result(result, directory):
+    """
+    Write every table of result as CSV and its summary as JSON into directory.
+    """
+    os.makedirs(directory, exist_ok=True)
+    for name, df in result.tables().items():
+        df.to_csv(os.path.join(directory, f"{name}.csv"), index=False)
+    with open(os.path.join(directory, "summary.json"), "w") as file:
+        json.dump(result.summary(), file, indent=2, default=str)
+    return directory
+
+
+def write_summaries(summaries, path):
+    """
+    Write one summary row per analyzed date as CSV.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    pd.DataFrame(summaries).to_csv(path, index=False)
+
+
+def run_statements(pool, args):
+    analyzer = PositionStatementAnalyzer(PositionStatements(pool), EodPrices(pool), TickerMappings(pool))
+    output_dir = os.path.join(args.output, "position_statement")
+    summaries = []
+    for day in date_range(args.start, args.end):
+        result = analyzer.analyze(
+            day, args.asset_class, args.client_name, args.custodian_name, args.threshold, search_vendors=not args.skip_vendors,
+            incremental=args.incremental,
+        )
+        # Every processed date gets a summary row; position_count tells an empty date from a clean one
+        summaries.append(result.summary())
+        if result.position_count == 0:
+            print(f"{day}: no position records")
+            continue
+        if not result.has_records:
+            print(f"{day}: no price differences or missing prices")
+            continue
+        write_result(result, os.path.join(output_dir, str(day)))
+        print(f"{day}: {len(result.significant_changes)} significant changes, {len(result.unidentified_tickers)} tickers not found")
+        if result.error:
+            print(f"{day}: {result.error}")
+    write_summaries(summaries, os.path.join(output_dir, f"summary_{args.start}_{args.end}.csv"))
+
+
+def run_fan_out(pool, args):
+    reconciler = FanOutReconciler(
+        PositionStatements(pool), EodPrices(pool), TickerMappings(pool), max_workers=args.workers
+    )
+    output_dir = os.path.join(args.output, "position_statement_fan_out")
+    summaries = []
+    for day in date_range(args.start, args.end):
+        result = reconciler.analyze(day, args.threshold, search_vendors=not args.skip_vendors)
+        if not result.combinations:
+            print(f"{day}: no position statements")
+            continue
+        write_result(result, os.path.join(output_dir, str(day)))
+        summary = result.summary()
+        summaries.append(summary)
+        print(f"{day}: {summary['combinations']} combinations, {summary['price_differences']} price differences, "
+              f"{summary['not_found_tickers']} tickers not found")
+        if result.error:
+            print(f"{day}: {result.error}")
+    write_summaries(summaries, os.path.join(output_dir, f"summary_{args.start}_{args.end}.csv"))
+
+
+def run_history(pool, args):
+    analyzer = PositionHistoryAnalyzer(PositionHistory(pool))
+    output_dir = os.path.join(args.output, "position_history")
+    if args.start != args.end:
+        result = analyzer.analyze_range(args.start, args.end, args.asset_class, args.threshold)
+        write_result(result, os.path.join(output_dir, f"{args.start}_{args.end}"))
+        print(f"{args.start} to {args.end}: {len(result.net_worth)} dates, {len(result.breaches)} breaches")
+        return
+
+    result = analyzer.analyze(args.start, args.asset_class, args.threshold)
+    write_result(result, os.path.join(output_dir, str(args.start)))
+    print(f"{args.start}: change {result.percentage_change}%, breached {result.breached}")
+
+
+def parse_report(value):
+    """
+    Parse a DATE=FILE report argument.
+    """
+    report_date, separator, path = value.partition("=")
+    if not separator or not path:
+        raise argparse.ArgumentTypeError(f"expected DATE=FILE, got {value!r}")
+    return date.fromisoformat(report_date), path
+
+
+def run_asset_class(pool, args):
+    analyzer = AssetClassAnalyzer(PositionStatements(pool))
+    if args.report:
+        with ExitStack() as stack:
+            result = analyzer.analyze_many([
+                (os.path.basename(path), report_date, ReportReader(stack.enter_context(open(path, "rb"))))
+                for report_date, path in args.report
+            ])
+        label = f"{min(result.dates)}_{max(result.dates)}"
+        write_result(result, os.path.join(args.output, "asset_class", label))
+        print(f"{len(args.report)} reports over {len(result.dates)} dates: {len(result.differences)} asset classes compared")
+        return
+
+    with open(args.json, "rb") as file:
+        result = analyzer.analyze(ReportReader(file), args.start)
+    write_result(result, os.path.join(args.output, "asset_class", str(args.start)))
+    print(f"{args.start}: {len(result.differences)} asset classes compared")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="python -m services.batch",
+        description="Run the analyzers without Streamlit against the DB_* database and write CSV and JSON summaries.",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    statements_parser = subparsers.add_parser("statements", help="Reconcile position statement prices with EOD prices.")
+    statements_parser.add_argument("--client-name", default=ALL)
+    statements_parser.add_argument("--custodian-name", default=ALL)
+    statements_parser.add_argument(
+        "--incremental", action="store_true", help="Only compare the positions changed since the last run of the same date and filters."
+    )
+    fan_out_parser = subparsers.add_parser(
+        "fan-out", help="Reconcile every (asset class, client, custodian) combination into one exceptions report."
+    )
+    fan_out_parser.add_argument("--workers", type=int, default=8, help="Combinations reconciled in parallel.")
+    history_parser = subparsers.add_parser("history", help="Check net worth changes of an asset class.")
+    asset_class_parser = subparsers.add_parser("asset-class", help="Compare a Net Worth JSON report with the position statements.")
+    asset_class_parser.add_argument("--json", help="Net Worth report file of --date.")
+    asset_class_parser.add_argument(
+        "--report", type=parse_report, action="append", metavar="DATE=FILE",
+        help="A Net Worth report and its date; repeat to reconcile many reports in one pass.",
+    )
+
+    for subparser in (statements_parser, fan_out_parser):
+        subparser.add_argument("--skip-vendors", action="store_true", help="Do not search unidentified tickers with the vendors.")
+    for subparser in (statements_parser, fan_out_parser, history_parser, asset_class_parser):
+        subparser.add_argument("--date", type=date.fromisoformat, help="Date to analyze (default: today).")
+        subparser.add_argument("--output", default=DEFAULT_OUTPUT_DIR, help="Directory for the reports.")
+    for subparser in (statements_parser, fan_out_parser, history_parser):
+        subparser.add_argument("--end-date", type=date.fromisoformat, help="Analyze every date from --date to this date.")
+        subparser.add_argument("--threshold", type=float, default=5, help="Threshold percentage.")
+    statements_parser.add_argument("--asset-class", default=ALL)
+    history_parser.add_argument("--asset-class", required=True)
+    args = parser.parse_args()
+
+    args.start = args.date or date.today()
+    args.end = getattr(args, "end_date", None) or args.start
+    if args.command == "asset-class" and not (args.json or args.report):
+        parser.error("asset-class needs --json or at least one --report")
+    if args.end < args.start:
+        parser.error("--end-date must not be before --date")
+
+    load_dotenv()
+    run_metrics = start_run()
+    pool = get_pool(env_db_config(), maxconn=max(10, getattr(args, "workers", 0) + 1))
+    commands = {"statements": run_statements, "fan-out": run_fan_out, "history": run_history, "asset-class": run_asset_class}
+    commands[args.command](pool, args)
+
+    os.makedirs(args.output, exist_ok=True)
+    with open(os.path.join(args.output, "metrics.txt"), "w") as file:
+        file.write(run_metrics.to_text())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+import time
+import threading
+import pandas as pd
+from repository.tables.daily_rollups import DailyRollups
+from repository.tables.statements import ALL
+
+
+class DimensionCatalogue:
+    """
+    Filter values for the page dropdowns, loaded with one query and shared by every
+    session of the process until the TTL expires or invalidate() is called.
+    Options cascade: each list is narrowed by the filters already chosen, in memory.
+    """
+
+    TTL = 300
+
+    _cache = {}
+    _lock = threading.Lock()
+
+    def __init__(self, pool, ttl=TTL):
+        self.pool = pool
+        self.ttl = ttl
+        self.rollups = DailyRollups(pool)
+
+    def _dimensions(self):
+        with self._lock:
+            cached = self._cache.get(id(self.pool))
+            if cached is not None and time.monotonic() - cached[0] < self.ttl:
+                return cached[1]
+
+            records = self.rollups.get_dimensions()
+            dimensions = pd.DataFrame(records, columns=["source", "asset_class", "client_name", "custodian_name"])
+            self._cache[id(self.pool)] = (time.monotonic(), dimensions)
+            return dimensions
+
+    @classmethod
+    def invalidate(cls):
+        """
+        Drop the cached filter values so the next call reloads them.
+        """
+        with cls._lock:
+            cls._cache.clear()
+
+    def _options(self, column, source="position_statements", **filters):
+        dimensions = self._dimensions()
+        selected = dimensions[dimensions["source"] == source]
+        for filter_column, value in filters.items():
+            if value != ALL:
+                selected = selected[selected[filter_column] == value]
+        return sorted(selected[column].dropna().unique().tolist())
+
+    def asset_classes(self, client_name=ALL, custodian_name=ALL):
+        return self._options("asset_class", client_name=client_name, custodian_name=custodian_name)
+
+    def client_names(self, asset_class=ALL, custodian_name=ALL):
+        return self._options("client_name", asset_class=asset_class, custodian_name=custodian_name)
+
+    def custodian_names(self, asset_class=ALL, client_name=ALL):
+        return self._options("custodian_name", asset_class=asset_class, client_name=client_name)
+
+    def history_asset_classes(self):
+        return self._options("asset_class", source="position_history")
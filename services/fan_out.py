@@ -0,0 +1,88 @@
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from repository.tables.statements import ALL
+from services.position_statement_analyzer import PositionStatementAnalyzer
+from services.results import FanOutResult, PositionStatementResult, STATEMENT_COLUMNS
+from utils.metrics import bind_context
+from utils.symbology import get_resolver
+
+
+FILTER_COLUMNS = ["Asset Class", "Client Name", "Custodian Name"]
+
+
+class FanOutReconciler:
+
+    def __init__(self, position_statements, eod_prices, ticker_mappings=None, api_clients=None, max_workers=8):
+        """
+        Runs the position statement reconciliation for every (asset class, client, custodian)
+        combination of a date on a thread pool. max_workers should not exceed the
+        connection pool size.
+        """
+        self.position_statements = position_statements
+        self.eod_prices = eod_prices
+        self.ticker_mappings = ticker_mappings
+        self.max_workers = max_workers
+        self.statement_analyzer = PositionStatementAnalyzer(position_statements, eod_prices, ticker_mappings, api_clients)
+
+    def reconcile_combination(self, date, combination, close_prices, resolver, threshold):
+        """
+        Reconcile the positions of one filter combination against the shared close price
+        snapshot and return its exceptions. Positions are streamed in chunks.
+        """
+        frames = [pd.DataFrame(columns=STATEMENT_COLUMNS + ["Exception"])]
+        for positions in self.position_statements.iter_records(date, *combination):
+            positions = positions.set_axis(["Security ID", "MTM Price", "ISIN", "CCY"], axis=1)
+            positions["Security ID"] = resolver.resolve(positions["Security ID"])
+            positions["Close Price"] = positions["Security ID"].map(close_prices)
+
+            significant_changes, unidentified_tickers = PositionStatementAnalyzer.compare_prices(positions, threshold)
+            frames.append(significant_changes[STATEMENT_COLUMNS].assign(Exception="Price difference"))
+            frames.append(unidentified_tickers[STATEMENT_COLUMNS].assign(Exception="Ticker not found"))
+
+        exceptions = pd.concat(frames, ignore_index=True)
+        for position, (column, value) in enumerate(zip(FILTER_COLUMNS, combination)):
+            exceptions.insert(position, column, value)
+        return exceptions
+
+    def resolve_with_vendors(self, date, threshold, exceptions):
+        """
+        Search every distinct unidentified ticker once with the vendors and record in a
+        'Resolved By' column where it was found.
+        """
+        vendor_result = PositionStatementResult(date, ALL, ALL, ALL, threshold)
+        not_found = exceptions[exceptions["Exception"] == "Ticker not found"].drop_duplicates(subset=["Security ID", "ISIN"])
+        missing_tickers = list(not_found[STATEMENT_COLUMNS].itertuples(index=False, name=None))
+        self.statement_analyzer.search_securities(missing_tickers, vendor_result)
+
+        resolved_by = PositionStatementAnalyzer.vendor_verdicts(exceptions["Security ID"], vendor_result)
+        resolved_by[exceptions["Exception"] != "Ticker not found"] = None
+        return exceptions.assign(**{"Resolved By": resolved_by}), vendor_result
+
+    def analyze(self, date, threshold, search_vendors=True):
+        """
+        Reconcile every filter combination of date and return a FanOutResult with one
+        consolidated exceptions table. Close prices are fetched once and shared by all
+        workers; unidentified tickers are searched with the vendors once for all combinations.
+        """
+        result = FanOutResult(date, threshold)
+        result.combinations = self.position_statements.get_filter_combinations(date)
+        if not result.combinations:
+            return result
+
+        close_prices = self.eod_prices.get_close_prices(date)
+        resolver = get_resolver(self.ticker_mappings)
+        result.error = resolver.mapping_error
+
+        def reconcile(combination):
+            return self.reconcile_combination(date, combination, close_prices, resolver, threshold)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            frames = list(executor.map(bind_context(reconcile), result.combinations))
+
+        exceptions = pd.concat(frames, ignore_index=True)
+        if search_vendors and (exceptions["Exception"] == "Ticker not found").any():
+            exceptions, vendor_result = self.resolve_with_vendors(date, threshold, exceptions)
+            result.market_db = vendor_result.market_db
+            result.error = vendor_result.error or result.error
+        result.exceptions = exceptions
+        return result
@@ -1,6 +1,6 @@
-import streamlit as st
 from datetime import timedelta
 import pandas as pd
+from services.results import PositionHistoryResult, PositionHistoryRangeResult
 
 class PositionHistoryAnalyzer:
 
@@ -15,65 +15,92 @@ class PositionHistoryAnalyzer:
         return round((current - previous) / previous * 100, 2) if previous != 0 else 0
 
     @staticmethod
-    def prepare_table_data(significant_changes, previous_date_data, current_date_data, current_date, previous_date):
+    def prepare_table_data(current_values, previous_values, difference, current_date, previous_date):
         """
-        This function prepares data for the Streamlit table display.
+        This function prepares the table of securities whose value changed.
         """
-        table_data = []
-        for security_id, difference in significant_changes:
-            current_values = current_date_data[security_id]
-            previous_values = previous_date_data.get(security_id, {"mtm_rpt_ccy": 0, "position_qty": 0, "mtm_price": 0})
-            table_data.append({
-                "Security ID": security_id,
-                f"Position Quantity on {previous_date}": previous_values["position_qty"],
-                f"MTM Price on {previous_date}": previous_values["mtm_price"],
-                f"Local CCY {previous_date}": previous_values["mtm_rpt_ccy"],
-                f"Position Quantity on {current_date}": current_values["position_qty"],
-                f"MTM Price on {current_date}": current_values["mtm_price"],
-                f"Local CCY {current_date}": current_values["mtm_rpt_ccy"],
-                "Change (%)": difference
-            })
-        return table_data
+        return pd.DataFrame({
+            "Security ID": current_values.index,
+            f"Position Quantity on {previous_date}": previous_values["position_qty"].values,
+            f"MTM Price on {previous_date}": previous_values["mtm_price"].values,
+            f"Local CCY {previous_date}": previous_values["mtm_rpt_ccy"].values,
+            f"Position Quantity on {current_date}": current_values["position_qty"].values,
+            f"MTM Price on {current_date}": current_values["mtm_price"].values,
+            f"Local CCY {current_date}": current_values["mtm_rpt_ccy"].values,
+            "Change (%)": difference.values
+        })
 
-    def run(self, current_date, asset_class, threshold):
+    def significant_changes(self, securities, current_date, previous_date, threshold):
         """
-        This function runs the entire analysis and displays the results in Streamlit.
+        This function returns the table of securities whose value changed by more than the threshold,
+        from 'security' rows of PositionHistory.iter_comparison.
         """
-        previous_date = current_date - timedelta(days=1)
+        value_columns = ["mtm_rpt_ccy", "position_qty", "mtm_price"]
+        securities = securities.set_index("security_id")
+        current_values = securities[value_columns]
+        previous_values = securities[[f"previous_{column}" for column in value_columns]].set_axis(value_columns, axis=1)
+
+        current_mtm = pd.to_numeric(current_values["mtm_rpt_ccy"], errors="coerce")
+        previous_mtm = pd.to_numeric(previous_values["mtm_rpt_ccy"], errors="coerce")
+        difference = ((current_mtm - previous_mtm) / previous_mtm.where(previous_mtm != 0) * 100).round(2).fillna(0)
+        significant = difference.abs() > threshold
 
-        current_net_worth = self.position_history.get_net_worth(current_date, asset_class)
-        previous_net_worth = self.position_history.get_net_worth(previous_date, asset_class)
+        return self.prepare_table_data(
+            current_values[significant], previous_values[significant], difference[significant], current_date, previous_date
+        )
+
+    def analyze(self, current_date, asset_class, threshold, chunk_size=None, on_chunk=None):
+        """
+        This function runs the entire analysis in one streamed query and returns a PositionHistoryResult.
+        Net worths are summed from the same per-security rows as the range check; securities are
+        only returned when the net worth breached the threshold, in chunks of chunk_size,
+        calling on_chunk with each chunk's table.
+        """
+        previous_date = current_date - timedelta(days=1)
+        result = PositionHistoryResult(current_date, previous_date, asset_class, threshold)
 
-        st.write(f"Networth on {previous_date} with asset class {asset_class} is {previous_net_worth}")
-        st.write(f"Networth on {current_date} with asset class {asset_class} is {current_net_worth}")
+        no_values = pd.DataFrame(columns=["mtm_rpt_ccy", "position_qty", "mtm_price"])
+        tables = [self.prepare_table_data(no_values, no_values, pd.Series(dtype=float), current_date, previous_date)]
+        for chunk in self.position_history.iter_comparison(current_date, previous_date, asset_class, threshold, chunk_size):
+            for total in chunk[chunk["level"] == "date"].itertuples(index=False):
+                result.current_net_worth = total.mtm_rpt_ccy or 0
+                result.previous_net_worth = total.previous_mtm_rpt_ccy or 0
+                result.percentage_change = None if pd.isna(total.change) else float(total.change)
 
-        if previous_net_worth != 0:
-            percentage_change = self.calculate_percentage_change(current_net_worth, previous_net_worth)
-            st.write(f"Percentage change is {percentage_change}%")
+            securities = chunk[chunk["level"] == "security"]
+            if securities.empty:
+                continue
+            table = self.significant_changes(securities, current_date, previous_date, threshold)
+            tables.append(table)
+            if on_chunk is not None:
+                on_chunk(table)
 
-            if abs(percentage_change) > threshold:
-                st.markdown(f"<p style='color:red'>The difference is more than {threshold}%, it's {percentage_change}%.</p>", unsafe_allow_html=True)
+        if result.breached:
+            result.significant_changes = pd.concat(tables, ignore_index=True)
+        return result
 
-                current_date_records = self.position_history.get_records(current_date, asset_class)
-                previous_date_records = self.position_history.get_records(previous_date, asset_class)
+    def analyze_range(self, start_date, end_date, asset_class, threshold):
+        """
+        This function checks every report date between start_date and end_date and returns all threshold breaches.
+        """
+        result = PositionHistoryRangeResult(start_date, end_date, asset_class, threshold)
+        records = self.position_history.get_range_changes(start_date, end_date, asset_class, threshold)
+        if not records:
+            return result
 
-                current_date_data = {record[0]: {"mtm_rpt_ccy": record[1], "position_qty": record[2], "mtm_price": record[3]} for record in current_date_records}
-                previous_date_data = {record[0]: {"mtm_rpt_ccy": record[1], "position_qty": record[2], "mtm_price": record[3]} for record in previous_date_records}
+        columns = ["Level", "Date", "Previous Date", "Security ID",
+                   "Previous Position Quantity", "Previous MTM Price", "Previous Local CCY",
+                   "Position Quantity", "MTM Price", "Local CCY", "Change (%)"]
+        changes = pd.DataFrame(records, columns=columns)
+        date_changes = changes[changes["Level"] == "date"]
+        security_changes = changes[changes["Level"] == "security"]
 
-                significant_changes = []
-                for security_id, current_values in current_date_data.items():
-                    previous_values = previous_date_data.get(security_id, {"mtm_rpt_ccy": 0, "position_qty": 0, "mtm_price": 0})
-                    difference = self.calculate_percentage_change(current_values["mtm_rpt_ccy"], previous_values["mtm_rpt_ccy"])
-                    if abs(difference) > threshold:
-                        significant_changes.append((security_id, difference))
+        net_worth = date_changes[["Date", "Previous Date", "Previous Local CCY", "Local CCY", "Change (%)"]].rename(
+            columns={"Previous Local CCY": "Previous Networth", "Local CCY": "Networth"}
+        )
+        breaches = net_worth["Change (%)"].astype(float).abs() > threshold
 
-                if significant_changes:
-                    st.write(f"Securities with more than {threshold}% changes:")
-                    table_data = self.prepare_table_data(significant_changes, previous_date_data, current_date_data, current_date, previous_date)
-                    st.dataframe(pd.DataFrame(table_data), use_container_width=True)
-                else: 
-                    st.write(f"No securities with more than {threshold}% changes.")
-            else:
-                st.markdown(f"<p style='color:green'>The difference is less than {threshold}%, it's {percentage_change}%.</p>", unsafe_allow_html=True)
-        else:
-            st.write("Unable to calculate the difference as the net worth for the previous date is zero.")
+        result.net_worth = net_worth.reset_index(drop=True)
+        result.breaches = net_worth[breaches].reset_index(drop=True)
+        result.security_changes = security_changes.drop(columns=["Level"]).reset_index(drop=True)
+        return result
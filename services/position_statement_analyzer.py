@@ -1,17 +1,37 @@
 import pandas as pd
-import streamlit as st
-from utils.mapping import ticker_mapping
-from repository.api.eodh import EodhAPI
-from repository.api.open_figi import OpenFigiAPI
-from repository.api.yfinance import YFinanceAPI
-from repository.api.market_db import MarketDBApi
+from repository.api import registry
+from repository.tables.reconciliation_rows import ReconciliationRows
+from services.results import PositionStatementResult, STATEMENT_COLUMNS
+from utils.symbology import get_resolver
+
+
+RECONCILIATION_NAMES = ["Security ID", "ISIN", "CCY", "MTM Price", "Close Price", "Source Security ID"]
+
+UNIDENTIFIED_COLUMNS = STATEMENT_COLUMNS + ["Source Security ID"]
+
+EXCEPTION_NAMES = [
+    "Row Hash", "Security ID", "ISIN", "CCY", "MTM Price", "Close Price", "Difference", "Matched",
+    "Source Security ID", "Resolved By",
+]
 
 
 class PositionStatementAnalyzer:
 
-    def __init__(self, position_statements, eod_prices):
+    def __init__(self, position_statements, eod_prices, ticker_mappings=None, api_clients=None, reconciliation_rows=None):
         self.position_statements = position_statements
         self.eod_prices = eod_prices
+        self.ticker_mappings = ticker_mappings
+        self.api_clients = api_clients
+        self.reconciliation_rows = reconciliation_rows if reconciliation_rows is not None else ReconciliationRows(eod_prices.pool)
+
+    def get_api_clients(self):
+        """
+        Return the (OpenFIGI, EODH, YFinance, MarketDB) clients: the ones passed to the
+        constructor, or the process-wide clients of the registry, built on first use.
+        """
+        if self.api_clients is not None:
+            return self.api_clients
+        return registry.get_api_clients()
 
     @staticmethod
     def calculate_percentage_change(mtm_price, close_price):
@@ -20,66 +40,17 @@ class PositionStatementAnalyzer:
         """
         return round((mtm_price - close_price) / close_price * 100, 2) if close_price != 0 else 0
     
-    @staticmethod
-    def santize_ticker(ticker_id):
-        """
-        Sanitize and return the ticker_id.
-        """
-        try:
-            ticker_id_formatted = ticker_mapping.get(ticker_id, ticker_id)
-            if ticker_id_formatted is None:
-                return None
-            if ticker_id_formatted not in ["BRK-B.US"]:
-                ticker_id_formatted = ticker_id_formatted.replace('_', '.').replace('-', '.').replace(' ', '.')
-            return ticker_id_formatted
-        except Exception as e:
-            raise ValueError(f"Error while sanitizing ticker: {str(e)}")
-        
-    @staticmethod
-    def display_data(data, title, column_names):
-        """
-        Display data in the Streamlit app with given title and column names.
-        """
-        st.title(title)
-        df = pd.DataFrame(data, columns=column_names)
-        st.dataframe(df, use_container_width=True)
-    
-
-    def display_security_found_eodh(self, security_found_eodh):
-        """
-        Display securities found in EODH in the Streamlit app.
-        """
-        st.title("Securities found in EODH")
-        security_found_eodh_df = pd.DataFrame(security_found_eodh)
-        st.dataframe(security_found_eodh_df, use_container_width=True)
-
-    def display_securities_found_in_yfinance(self, yfinance_df):
-        st.title("Securities found in YFinance")
-        st.dataframe(yfinance_df, use_container_width=True)
-
-    
-    def display_securities_not_found(self, securities_not_found):
-        st.title("Securities not found in EODH and YFinance")
-        st.dataframe(securities_not_found, use_container_width=True)
-
-
     def search_tickers_in_open_figi(self, missing_tickers, figi_api):
         """
         Search tickers for missing tickers in OpenFigi API and return the merged DataFrame.
+        All ISINs are mapped in batched requests; ISINs without a mapping are returned separately.
         """
         if not missing_tickers:
             return pd.DataFrame()
 
-        figi_tickers_df = pd.DataFrame()
-        not_found_tickers = []
-        for ticker in missing_tickers:
-            isin = ticker[1]
-            try:
-                temp_df = figi_api.get_ticker_data(isin)
-                figi_tickers_df = pd.concat([figi_tickers_df, temp_df], ignore_index=True)
-            except Exception as e:
-                isin = ticker[1]
-                not_found_tickers.append(isin)
+        isins = [ticker[1] for ticker in missing_tickers]
+        figi_tickers_df, figi_failures_df = figi_api.map_isins(isins)
+        not_found_tickers = figi_failures_df["ISIN"].tolist()
         return figi_tickers_df, not_found_tickers
     
     def get_info_for_unique_tickers(self, merged_df, eodh_api):
@@ -112,6 +83,8 @@ class PositionStatementAnalyzer:
     def find_security_in_eodh(self, ticker_info_df, missing_tickers_df):
         """
         Find securities in EODH for missing_tickers_df and return the results.
+        Each security code is joined to the currency of its first EODH result and of its first
+        record, and kept when the two match.
         """
         if missing_tickers_df is None or missing_tickers_df.empty:
             return []
@@ -119,68 +92,63 @@ class PositionStatementAnalyzer:
         if ticker_info_df is None or ticker_info_df.empty:
             return []
 
-        securities_found_in_eodh = []
-        for security_code in missing_tickers_df["Security Code"]:
-            if security_code in ticker_info_df['Code'].tolist():
-                try:
-                    security_currency = ticker_info_df.loc[ticker_info_df['Code'] == security_code, 'Currency'].iloc[0]
-                    record_currency = missing_tickers_df.loc[missing_tickers_df['Security Code'] == security_code, 'Currency'].iloc[0]
-                    if security_currency == record_currency:
-                        securities_found_in_eodh.append({"Security Code": security_code, "Currency": security_currency, "Record Currency": record_currency})
-                except Exception as e:
-                    raise ValueError(f"Error while finding securities in EODH: {str(e)}")
-        return securities_found_in_eodh
+        try:
+            eodh_currencies = (
+                ticker_info_df.dropna(subset=['Code'])
+                .drop_duplicates(subset=['Code'])[['Code', 'Currency']]
+                .rename(columns={'Code': 'Security Code'})
+            )
+            record_currencies = (
+                missing_tickers_df.drop_duplicates(subset=['Security Code'])[['Security Code', 'Currency']]
+                .rename(columns={'Currency': 'Record Currency'})
+            )
+            # Left joins keep the row order of missing_tickers_df, duplicates included
+            candidates = (
+                missing_tickers_df[['Security Code']]
+                .merge(record_currencies, on='Security Code', how='left')
+                .merge(eodh_currencies, on='Security Code', how='left')
+            )
+        except Exception as e:
+            raise ValueError(f"Error while finding securities in EODH: {str(e)}")
+        securities_found_in_eodh = candidates[candidates['Currency'] == candidates['Record Currency']]
+        return securities_found_in_eodh[['Security Code', 'Currency', 'Record Currency']].to_dict('records')
     
     def get_missing_tickers_eodh(self, not_found_df, security_found_eodh):
-        security_codes = not_found_df['Security Code'].unique().tolist()
-
-        for security in security_found_eodh:
-            security_code = security['Security Code']
-            if security_code in security_codes:
-                security_codes.remove(security_code)
-
-        return security_codes
+        """
+        Return the unique security codes of not_found_df that were not found in EODH, in order.
+        """
+        security_codes = pd.Series(not_found_df['Security Code'].unique(), dtype=object)
+        found_codes = {security['Security Code'] for security in security_found_eodh}
+        return security_codes[~security_codes.isin(found_codes)].tolist()
 
     def get_unfound_securities(self, missing_tickers_df, securities_found_in_eodh, yfinance_securities_df):
-        if yfinance_securities_df is None or yfinance_securities_df.empty:
-            eodh_security_codes = [security['Security Code'] for security in securities_found_in_eodh]
-            missing_tickers_df = missing_tickers_df[~missing_tickers_df['Security Code'].isin(eodh_security_codes)]
-            return missing_tickers_df
-
-        
-        yfinance_security_codes = yfinance_securities_df['Ticker'].tolist()
-
-        for security in securities_found_in_eodh:
-            yfinance_security_codes.append(security['Security Code'])
-
-        return missing_tickers_df[~missing_tickers_df['Security Code'].isin(yfinance_security_codes)]
+        """
+        Return the rows of missing_tickers_df whose security code was found neither in EODH nor in YFinance.
+        """
+        found_codes = {security['Security Code'] for security in securities_found_in_eodh}
+        if yfinance_securities_df is not None and not yfinance_securities_df.empty:
+            found_codes.update(yfinance_securities_df['Ticker'])
+        return missing_tickers_df[~missing_tickers_df['Security Code'].isin(found_codes)]
     
     def add_ticker_market_db(self, market_db_api, securities_found_in_eodh):
         if securities_found_in_eodh is None:
-            st.warning("securities_found_in_eodh must not be None or empty")
-            return
+            return None
 
-        securities_found_in_eodh_df = pd.DataFrame(securities_found_in_eodh)
-        eodh_symbol_list = securities_found_in_eodh_df['Security Code'].to_list()
-        market_db_api.add_tickers(eodh_symbol_list)
+        eodh_symbol_list = [security['Security Code'] for security in securities_found_in_eodh]
+        return market_db_api.register_tickers(eodh_symbol_list)
 
-    def search_and_display_security_eodh(self, missing_tickers):
+    def search_securities(self, missing_tickers, result):
         """
-        Search and display securities found in EODH in the Streamlit app.
+        Look the unidentified tickers up in OpenFigi, EODH and YFinance and store the
+        outcome on result. A vendor failure is recorded as result.error.
         """
         if not missing_tickers:
-            st.warning("No missing tickers to process.")
-            return
+            return result
 
-        figi_api = OpenFigiAPI()
-        eodh_api = EodhAPI()
-        yfinance_api = YFinanceAPI()
-        market_db_api = MarketDBApi()
+        figi_api, eodh_api, yfinance_api, market_db_api = self.get_api_clients()
         try:
             figi_tickers_df, not_found_figi_tickers = self.search_tickers_in_open_figi(missing_tickers, figi_api)
-
-            self.display_data(not_found_figi_tickers, "Not found OpenFigi tickers", ["ISIN"])
-
+            result.figi_not_found = pd.DataFrame(not_found_figi_tickers, columns=["ISIN"])
 
             # Add 'Security Code' column to the missing_tickers DataFrame
             missing_tickers_df = self.add_security_code_column(missing_tickers)
@@ -190,60 +158,188 @@ class PositionStatementAnalyzer:
         
             # Find securities in EODH for missing_tickers_df
             securities_found_in_eodh = self.find_security_in_eodh(ticker_info_df, missing_tickers_df)
-
-            # Display securities found in EODH
-            self.display_security_found_eodh(securities_found_in_eodh)
+            result.eodh_found = pd.DataFrame(securities_found_in_eodh)
 
             # Add tickers to market_db
-            self.add_ticker_market_db(market_db_api, securities_found_in_eodh)
+            result.market_db = self.add_ticker_market_db(market_db_api, securities_found_in_eodh)
             
             # Get remaining missing tickers after checking in EODH
             missing_tickers_eodh = self.get_missing_tickers_eodh(missing_tickers_df, securities_found_in_eodh)
 
             # Search for remaining missing tickers in YFinance
-            yfinance_securities_df = yfinance_api.get_data_multiple_tickers(missing_tickers_eodh)
-            
-            # Display securities found in YFinance
-            self.display_securities_found_in_yfinance(yfinance_securities_df)            
+            yfinance_securities_df = pd.DataFrame()
+            if missing_tickers_eodh:
+                yfinance_securities_df, _ = yfinance_api.get_data_multiple_tickers_parallel(missing_tickers_eodh)
+            result.yfinance_found = yfinance_securities_df
 
             # Get unfound securities after searching in EODH and YFinance
-            unfound_securities = self.get_unfound_securities(missing_tickers_df, securities_found_in_eodh, yfinance_securities_df)
-            
-            # Display unfound securities
-            self.display_securities_not_found(unfound_securities)
+            result.not_found = self.get_unfound_securities(missing_tickers_df, securities_found_in_eodh, yfinance_securities_df)
             
         except Exception as e:
-            st.error(f"Error occurred: {str(e)}")
+            result.error = f"Error occurred: {str(e)}"
+        return result
+
+    @staticmethod
+    def vendor_verdicts(security_ids, result):
+        """
+        Return where each security id was found by search_securities: "EODH", "YFinance",
+        "Not found", or None when the search has no answer for it.
+        """
+        security_codes = pd.Series(security_ids, dtype=object).str.split(".").str[0]
+        verdicts = pd.Series(None, index=security_codes.index, dtype=object)
+        if result.not_found is not None:
+            verdicts[security_codes.isin(result.not_found["Security Code"])] = "Not found"
+        if result.yfinance_found is not None and not result.yfinance_found.empty:
+            verdicts[security_codes.isin(result.yfinance_found["Ticker"])] = "YFinance"
+        if result.eodh_found is not None and not result.eodh_found.empty:
+            verdicts[security_codes.isin(result.eodh_found["Security Code"])] = "EODH"
+        return verdicts
 
 
-    def run(self, date, asset_class, client_name, custodian_name, threshold):
+    @staticmethod
+    def price_differences(reconciliation_df):
         """
-        Run the analyzer and display the results using Streamlit.
+        Return reconciliation_df with numeric prices, the missing close prices set to 0, the
+        percentage Difference and a Matched column telling whether a close price was found.
+        The percentage difference is computed for all matched rows in one vectorized step.
         """
-        position_records = self.position_statements.get_records(date, asset_class, client_name, custodian_name)
+        close_price = pd.to_numeric(reconciliation_df["Close Price"], errors="coerce").fillna(0)
+        mtm_price = pd.to_numeric(reconciliation_df["MTM Price"], errors="coerce")
+        matched = close_price != 0
 
-        if not position_records:
-            st.warning("No position records to process.")
-            return
-        
-        significant_price_changes = []
-        unidentified_tickers = []
-        for record in position_records:
-            security_id = record[0]
-            market_to_market_price = record[1]
-            isin = record[2]
-            currency_code = record[3]
-            sanitized_security_id = self.santize_ticker(security_id)
-            eod_price = self.eod_prices.get_records(date, sanitized_security_id)
-
-            if eod_price != 0:
-                percentage_difference = self.calculate_percentage_change(market_to_market_price, eod_price)
-                if abs(percentage_difference) >= threshold:
-                    significant_price_changes.append((sanitized_security_id, isin, currency_code, market_to_market_price, eod_price, percentage_difference))
-            elif isin != "0":
-                unidentified_tickers.append((sanitized_security_id, isin, currency_code, market_to_market_price, eod_price, 0))
-
-        column_names = ["Security ID", "ISIN", "CCY", "MTM Price", "Close Price", "Difference"]
-        self.display_data(significant_price_changes, "Significant Changes", column_names)
-        self.display_data(unidentified_tickers, "Not Found Tickers", column_names)
-        self.search_and_display_security_eodh(unidentified_tickers)
\ No newline at end of file
+        difference = ((mtm_price - close_price) / close_price.where(matched) * 100).round(2).fillna(0)
+        return reconciliation_df.assign(
+            **{"MTM Price": mtm_price, "Close Price": close_price, "Difference": difference, "Matched": matched}
+        )
+
+    @staticmethod
+    def split_price_changes(compared_df, threshold):
+        """
+        Split rows of price_differences into significant price changes and unidentified tickers.
+        A matched row without an MTM price is reported as a significant price change.
+        """
+        matched = compared_df["Matched"].astype(bool)
+        significant = (compared_df["Difference"].abs() >= threshold) | compared_df["MTM Price"].isna()
+        significant_price_changes = compared_df[matched & significant]
+        unidentified_tickers = compared_df[~matched & (compared_df["ISIN"] != "0")]
+        return significant_price_changes, unidentified_tickers
+
+    @staticmethod
+    def compare_prices(reconciliation_df, threshold):
+        """
+        Split reconciliation rows into significant price changes and unidentified tickers.
+        """
+        compared_df = PositionStatementAnalyzer.price_differences(reconciliation_df)
+        return PositionStatementAnalyzer.split_price_changes(compared_df, threshold)
+
+    def iter_price_changes(self, date, asset_class, client_name, custodian_name, threshold, chunk_size=None):
+        """
+        Stream the reconciliation rows of a date and yield (significant_price_changes, unidentified_tickers)
+        for every chunk, so results are available before the whole date has been read. The unidentified
+        tickers keep the security id of the position statement in a Source Security ID column.
+        """
+        resolver = get_resolver(self.ticker_mappings)
+        chunks = self.eod_prices.iter_reconciliation_records(
+            date, asset_class, client_name, custodian_name, threshold, resolver.mapping, chunk_size
+        )
+        for chunk in chunks:
+            reconciliation_df = chunk.set_axis(RECONCILIATION_NAMES, axis=1)
+            significant_price_changes, unidentified_tickers = self.compare_prices(reconciliation_df, threshold)
+            yield significant_price_changes[STATEMENT_COLUMNS], unidentified_tickers[UNIDENTIFIED_COLUMNS]
+
+    def iter_changed_price_changes(self, date, asset_class, client_name, custodian_name, threshold, result, chunk_size=None):
+        """
+        Like iter_price_changes, but the run is kept on the server in reconciliation_rows: only the
+        rows whose inputs changed since the last run of the same date and filters are compared there,
+        and only the rows that need attention are streamed back, with the vendor verdict stored for
+        them by an earlier run in a Resolved By column. The unidentified tickers also carry their
+        Row Hash. The number of compared and reused positions is recorded on result.
+        """
+        resolver = get_resolver(self.ticker_mappings)
+        run_key = ReconciliationRows.run_key(date, asset_class, client_name, custodian_name)
+        positions, compared, _ = self.reconciliation_rows.sync(
+            run_key, date, asset_class, client_name, custodian_name, resolver.mapping
+        )
+        result.position_count = positions
+        result.compared_rows = compared
+        result.reused_rows = positions - compared
+
+        for chunk in self.reconciliation_rows.iter_exceptions(run_key, threshold, chunk_size):
+            compared_df = chunk.set_axis(EXCEPTION_NAMES, axis=1)
+            compared_df["MTM Price"] = pd.to_numeric(compared_df["MTM Price"], errors="coerce")
+            compared_df["Close Price"] = pd.to_numeric(compared_df["Close Price"], errors="coerce")
+            compared_df["Difference"] = pd.to_numeric(compared_df["Difference"], errors="coerce")
+            significant_price_changes, unidentified_tickers = self.split_price_changes(compared_df, threshold)
+            yield (significant_price_changes[STATEMENT_COLUMNS].reset_index(drop=True),
+                   unidentified_tickers[UNIDENTIFIED_COLUMNS + ["Row Hash", "Resolved By"]].reset_index(drop=True))
+
+    def search_changed_securities(self, run_key, unidentified_tickers, result):
+        """
+        Search the unidentified tickers of an incremental run that have no stored vendor verdict,
+        store the verdicts the search gave and report the stored ones of the other tickers in
+        result.reused_verdicts. Verdicts are not stored when the search failed.
+        """
+        stored = unidentified_tickers["Resolved By"].notna()
+        result.reused_verdicts = (
+            unidentified_tickers.loc[stored, ["Security ID", "ISIN", "Resolved By"]]
+            .drop_duplicates().reset_index(drop=True)
+        )
+
+        searched = unidentified_tickers[~stored]
+        missing_tickers = list(searched[STATEMENT_COLUMNS].itertuples(index=False, name=None))
+        previous_error = result.error
+        self.search_securities(missing_tickers, result)
+        if missing_tickers and result.error is previous_error:
+            verdicts = self.vendor_verdicts(searched["Security ID"].values, result)
+            verdicts.index = searched["Row Hash"].values
+            verdicts = verdicts.dropna()
+            self.reconciliation_rows.save_verdicts(run_key, dict(zip(verdicts.index, verdicts)))
+
+    def analyze(self, date, asset_class, client_name, custodian_name, threshold, search_vendors=True, chunk_size=None, on_chunk=None,
+                incremental=False):
+        """
+        Reconcile the position statement prices with the EOD close prices and return a
+        PositionStatementResult. Rows are processed in chunks of chunk_size; on_chunk, if
+        given, is called with the (significant_price_changes, unidentified_tickers) of each chunk.
+        With incremental, only the rows changed since the last run are compared, and unidentified
+        tickers with a vendor verdict stored by an earlier run are not searched again.
+        When no exception comes back, the positions are counted so that a date without
+        positions can be told from a date that fully reconciled.
+        The ticker mapping issues of the unidentified tickers are reported in result.ticker_issues.
+        Unidentified tickers are searched with the vendors unless search_vendors is False.
+        A failure to load the database ticker mappings is recorded as result.error.
+        """
+        result = PositionStatementResult(date, asset_class, client_name, custodian_name, threshold)
+        result.error = get_resolver(self.ticker_mappings).mapping_error
+        if incremental:
+            price_changes = self.iter_changed_price_changes(date, asset_class, client_name, custodian_name, threshold, result, chunk_size)
+        else:
+            price_changes = self.iter_price_changes(date, asset_class, client_name, custodian_name, threshold, chunk_size)
+
+        significant_frames, unidentified_frames, source_ids, verdict_frames = [], [], [], []
+        for significant_price_changes, unidentified_tickers in price_changes:
+            result.has_records = True
+            source_ids.append(unidentified_tickers["Source Security ID"])
+            if incremental:
+                verdict_frames.append(unidentified_tickers)
+            unidentified_tickers = unidentified_tickers[STATEMENT_COLUMNS]
+            significant_frames.append(significant_price_changes)
+            unidentified_frames.append(unidentified_tickers)
+            if on_chunk is not None:
+                on_chunk(significant_price_changes, unidentified_tickers)
+
+        if not result.has_records:
+            if result.position_count is None:
+                result.position_count = self.position_statements.count_records(date, asset_class, client_name, custodian_name)
+            return result
+
+        result.significant_changes = pd.concat(significant_frames, ignore_index=True)
+        result.unidentified_tickers = pd.concat(unidentified_frames, ignore_index=True)
+        result.ticker_issues = get_resolver(self.ticker_mappings).report(pd.concat(source_ids, ignore_index=True))
+        if search_vendors and incremental:
+            run_key = ReconciliationRows.run_key(date, asset_class, client_name, custodian_name)
+            self.search_changed_securities(run_key, pd.concat(verdict_frames, ignore_index=True), result)
+        elif search_vendors:
+            missing_tickers = list(result.unidentified_tickers.itertuples(index=False, name=None))
+            self.search_securities(missing_tickers, result)
+        return result
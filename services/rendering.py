@@ -0,0 +1,140 @@
+import streamlit as st
+
+
+def display_table(title, df):
+    """
+    Display a DataFrame under a title in the Streamlit app.
+    """
+    st.title(title)
+    st.dataframe(df, use_container_width=True)
+
+
+class StreamedTables:
+    """
+    Titled tables that are created with the first chunk and grow as later chunks arrive.
+    """
+
+    def __init__(self, *titles):
+        self.titles = titles
+        self.elements = None
+
+    @property
+    def shown(self):
+        return self.elements is not None
+
+    def add(self, *frames):
+        if self.elements is None:
+            self.elements = []
+            for title, df in zip(self.titles, frames):
+                st.title(title)
+                self.elements.append(st.dataframe(df, use_container_width=True))
+            return
+
+        for element, df in zip(self.elements, frames):
+            if not df.empty:
+                element.add_rows(df)
+
+
+def position_statement_tables():
+    """
+    Return the StreamedTables for the price tables of the position statement analyzer.
+    Pass its add method as on_chunk and the tables to render_position_statement.
+    """
+    return StreamedTables("Significant Changes", "Not Found Tickers")
+
+
+def render_position_statement(result, streamed_tables=None):
+    """
+    Display a PositionStatementResult. The price tables are skipped when they were
+    already displayed chunk by chunk through streamed_tables.
+    """
+    if result.compared_rows is not None:
+        st.caption(f"Compared {result.compared_rows} changed rows, reused the last run for {result.reused_rows} rows.")
+    if result.position_count == 0:
+        st.warning("No position records to process.")
+        return
+    if not result.has_records:
+        st.warning("No price differences or missing prices to process.")
+        return
+
+    if streamed_tables is None or not streamed_tables.shown:
+        display_table("Significant Changes", result.significant_changes)
+        display_table("Not Found Tickers", result.unidentified_tickers)
+    if not result.ticker_issues.empty:
+        display_table("Ticker Mapping Issues", result.ticker_issues)
+
+    if result.unidentified_tickers.empty:
+        st.warning("No missing tickers to process.")
+        return
+
+    if result.figi_not_found is not None:
+        display_table("Not found OpenFigi tickers", result.figi_not_found)
+    if result.eodh_found is not None:
+        display_table("Securities found in EODH", result.eodh_found)
+    if result.yfinance_found is not None:
+        display_table("Securities found in YFinance", result.yfinance_found)
+    if result.not_found is not None:
+        display_table("Securities not found in EODH and YFinance", result.not_found)
+    if result.reused_verdicts is not None and not result.reused_verdicts.empty:
+        display_table("Vendor results from the last run", result.reused_verdicts)
+    if result.error:
+        st.error(result.error)
+
+
+def render_position_history(result):
+    """
+    Display a PositionHistoryResult.
+    """
+    st.write(f"Networth on {result.previous_date} with asset class {result.asset_class} is {result.previous_net_worth}")
+    st.write(f"Networth on {result.current_date} with asset class {result.asset_class} is {result.current_net_worth}")
+
+    if result.percentage_change is None:
+        st.write("Unable to calculate the difference as the net worth for the previous date is zero.")
+        return
+
+    threshold, percentage_change = result.threshold, result.percentage_change
+    st.write(f"Percentage change is {percentage_change}%")
+    if not result.breached:
+        st.markdown(f"<p style='color:green'>The difference is less than {threshold}%, it's {percentage_change}%.</p>", unsafe_allow_html=True)
+        return
+
+    st.markdown(f"<p style='color:red'>The difference is more than {threshold}%, it's {percentage_change}%.</p>", unsafe_allow_html=True)
+    if not result.significant_changes.empty:
+        st.write(f"Securities with more than {threshold}% changes:")
+        st.dataframe(result.significant_changes, use_container_width=True)
+    else:
+        st.write(f"No securities with more than {threshold}% changes.")
+
+
+def render_position_history_range(result):
+    """
+    Display a PositionHistoryRangeResult.
+    """
+    threshold = result.threshold
+    if result.net_worth.empty:
+        st.write(f"No position history for asset class {result.asset_class} between {result.start_date} and {result.end_date}.")
+        return
+
+    st.write(f"Networth of asset class {result.asset_class} from {result.start_date} to {result.end_date}:")
+    st.dataframe(result.net_worth, use_container_width=True)
+
+    if not result.breaches.empty:
+        st.markdown(f"<p style='color:red'>The networth changed by more than {threshold}% on {len(result.breaches)} date(s).</p>", unsafe_allow_html=True)
+        st.dataframe(result.breaches, use_container_width=True)
+    else:
+        st.markdown(f"<p style='color:green'>The networth changed by less than {threshold}% on every date.</p>", unsafe_allow_html=True)
+
+    if not result.security_changes.empty:
+        st.write(f"Securities with more than {threshold}% changes:")
+        st.dataframe(result.security_changes, use_container_width=True)
+    else:
+        st.write(f"No securities with more than {threshold}% changes.")
+
+
+def render_asset_class(result):
+    """
+    Display an AssetClassResult.
+    """
+    display_table("JSON Data", result.json_data)
+    display_table("Position Statement Data", result.position_statement)
+    display_table("Difference between JSON and Position Statement", result.differences)
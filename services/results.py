@@ -0,0 +1,211 @@
+import pandas as pd
+
+
+STATEMENT_COLUMNS = ["Security ID", "ISIN", "CCY", "MTM Price", "Close Price", "Difference"]
+
+
+class PositionStatementResult:
+
+    def __init__(self, date, asset_class, client_name, custodian_name, threshold):
+        """
+        Outcome of a position statement reconciliation. The vendor search tables stay None
+        when the search did not run, and the compared and reused row counts unless the
+        run was incremental. position_count is only known when no exception came back or
+        the run was incremental. reused_verdicts lists the unidentified tickers of an
+        incremental run whose vendor verdict was stored by an earlier run and not searched again.
+        """
+        self.date = date
+        self.asset_class = asset_class
+        self.client_name = client_name
+        self.custodian_name = custodian_name
+        self.threshold = threshold
+        self.has_records = False
+        self.position_count = None
+        self.significant_changes = pd.DataFrame(columns=STATEMENT_COLUMNS)
+        self.unidentified_tickers = pd.DataFrame(columns=STATEMENT_COLUMNS)
+        self.figi_not_found = None
+        self.eodh_found = None
+        self.yfinance_found = None
+        self.not_found = None
+        self.reused_verdicts = None
+        self.market_db = None
+        self.ticker_issues = pd.DataFrame(columns=["Security ID", "Issue"])
+        self.compared_rows = None
+        self.reused_rows = None
+        self.error = None
+
+    def tables(self):
+        """
+        Return the non-empty result tables by file name.
+        """
+        tables = {
+            "significant_changes": self.significant_changes,
+            "not_found_tickers": self.unidentified_tickers,
+            "ticker_mapping_issues": self.ticker_issues,
+            "not_found_open_figi": self.figi_not_found,
+            "found_eodh": self.eodh_found,
+            "found_yfinance": self.yfinance_found,
+            "not_found_vendors": self.not_found,
+            "reused_vendor_verdicts": self.reused_verdicts,
+        }
+        return {name: df for name, df in tables.items() if df is not None}
+
+    def summary(self):
+        return {
+            "date": str(self.date),
+            "asset_class": self.asset_class,
+            "client_name": self.client_name,
+            "custodian_name": self.custodian_name,
+            "threshold": self.threshold,
+            "position_count": self.position_count,
+            "significant_changes": len(self.significant_changes),
+            "not_found_tickers": len(self.unidentified_tickers),
+            "ticker_mapping_issues": len(self.ticker_issues),
+            "found_eodh": None if self.eodh_found is None else len(self.eodh_found),
+            "found_yfinance": None if self.yfinance_found is None else len(self.yfinance_found),
+            "not_found_vendors": None if self.not_found is None else len(self.not_found),
+            "reused_vendor_verdicts": None if self.reused_verdicts is None else len(self.reused_verdicts),
+            "market_db_failed": None if self.market_db is None else len(self.market_db["failed"]),
+            "compared_rows": self.compared_rows,
+            "reused_rows": self.reused_rows,
+            "error": self.error,
+        }
+
+
+class FanOutResult:
+
+    def __init__(self, date, threshold):
+        """
+        Consolidated exceptions of the position statement reconciliation across every
+        (asset class, client, custodian) combination of a date.
+        """
+        self.date = date
+        self.threshold = threshold
+        self.combinations = []
+        self.exceptions = pd.DataFrame()
+        self.market_db = None
+        self.error = None
+
+    def tables(self):
+        return {"exceptions": self.exceptions}
+
+    def summary(self):
+        exceptions = self.exceptions.get("Exception", pd.Series(dtype=object))
+        return {
+            "date": str(self.date),
+            "threshold": self.threshold,
+            "combinations": len(self.combinations),
+            "price_differences": int((exceptions == "Price difference").sum()),
+            "not_found_tickers": int((exceptions == "Ticker not found").sum()),
+            "market_db_failed": None if self.market_db is None else len(self.market_db["failed"]),
+            "error": self.error,
+        }
+
+
+class PositionHistoryResult:
+
+    def __init__(self, current_date, previous_date, asset_class, threshold):
+        """
+        Net worth change of an asset class between two report dates. percentage_change is None
+        when the previous net worth is zero, and significant_changes is None unless the
+        change breached the threshold.
+        """
+        self.current_date = current_date
+        self.previous_date = previous_date
+        self.asset_class = asset_class
+        self.threshold = threshold
+        self.current_net_worth = 0
+        self.previous_net_worth = 0
+        self.percentage_change = None
+        self.significant_changes = None
+
+    @property
+    def breached(self):
+        return self.percentage_change is not None and abs(self.percentage_change) > self.threshold
+
+    def tables(self):
+        return {} if self.significant_changes is None else {"significant_changes": self.significant_changes}
+
+    def summary(self):
+        return {
+            "date": str(self.current_date),
+            "previous_date": str(self.previous_date),
+            "asset_class": self.asset_class,
+            "threshold": self.threshold,
+            "previous_net_worth": float(self.previous_net_worth),
+            "net_worth": float(self.current_net_worth),
+            "change_pct": self.percentage_change,
+            "breached": self.breached,
+            "significant_changes": 0 if self.significant_changes is None else len(self.significant_changes),
+        }
+
+
+class PositionHistoryRangeResult:
+
+    def __init__(self, start_date, end_date, asset_class, threshold):
+        """
+        Net worth of an asset class for every report date in a range, with the dates and
+        securities that breached the threshold.
+        """
+        self.start_date = start_date
+        self.end_date = end_date
+        self.asset_class = asset_class
+        self.threshold = threshold
+        self.net_worth = pd.DataFrame()
+        self.breaches = pd.DataFrame()
+        self.security_changes = pd.DataFrame()
+
+    def tables(self):
+        return {"net_worth": self.net_worth, "breaches": self.breaches, "security_changes": self.security_changes}
+
+    def summary(self):
+        return {
+            "start_date": str(self.start_date),
+            "end_date": str(self.end_date),
+            "asset_class": self.asset_class,
+            "threshold": self.threshold,
+            "dates": len(self.net_worth),
+            "breaches": len(self.breaches),
+            "security_changes": len(self.security_changes),
+        }
+
+
+class AssetClassResult:
+
+    def __init__(self, date):
+        """
+        Asset class totals of a Net Worth report next to the position statement totals.
+        """
+        self.date = date
+        self.json_data = pd.DataFrame()
+        self.position_statement = pd.DataFrame()
+        self.differences = pd.DataFrame()
+
+    def tables(self):
+        return {"json_data": self.json_data, "position_statement": self.position_statement, "differences": self.differences}
+
+    def summary(self):
+        return {
+            "date": str(self.date),
+            "asset_classes": len(self.differences),
+            "max_abs_difference_pct": float(self.differences["Percentage Difference"].abs().max()) if not self.differences.empty else None,
+        }
+
+
+class AssetClassBatchResult(AssetClassResult):
+
+    def __init__(self, dates):
+        """
+        Differences of many Net Worth reports, each tagged with a report name and a date.
+        """
+        super().__init__(None)
+        self.dates = dates
+
+    def summary(self):
+        differences = self.differences.get("Percentage Difference", pd.Series(dtype=float))
+        return {
+            "dates": [str(date) for date in self.dates],
+            "reports": int(self.json_data["Report"].nunique()) if "Report" in self.json_data else 0,
+            "differences": len(self.differences),
+            "max_abs_difference_pct": float(differences.abs().max()) if not differences.empty else None,
+        }
@@ -6,7 +6,6 @@ ticker_mapping = {
     '7269 JT': '7269.T',
     '7269-JT': '7269.T',
     'A17U-SG': 'A17U.SG',
-    'AHYG SP': 'SG2D83975482.SI',
     'AJAC SP': 'N6M.SI',
     'APPL US': 'APPLX.US',
     'APPL-US': 'APPLX.US',
@@ -16,7 +15,6 @@ ticker_mapping = {
     'BN2-SG': 'BN2.SI',
     'BRK.B-US': 'BRK-B.US',
     'CA-25APRKEP-RT': 'A7RU.SI',
-    'CA-MSCIRUSSIA': '',
     'CD SP': 'VZ1.F',
     'CH0516982375': '',
     'CICT SP': 'C38U.SI',
@@ -35,7 +33,6 @@ ticker_mapping = {
     'GLIN UP': 'GLIN.US',
     'HDB UN': 'HDB.US',
     'HK0000084514': '0P0000TYLE',
-    'IEMB-GB': 'IEMB.LSE',
     'IE00B433M743': '0P0000M88X',
     'IEOOB433M743': '0P0000M88X',
     'IYH UP': 'IYH.US',
@@ -229,7 +226,6 @@ asset_map = {
     "Loan": "Loan",
     "Other Funds": "Equity & Equivalent",
     "Fixed Income": "Bonds & Equivalent",
-    "Bond": "Bonds & Equivalent",
     "Equity Derivatives": "Equity & Equivalent",
     "Equity Fund": "Equity & Equivalent",
     "others": "Others",
@@ -0,0 +1,164 @@
+import time
+import bisect
+import threading
+import contextvars
+from contextlib import contextmanager
+
+
+# Upper bounds, in seconds, of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, float("inf"))
+
+
+class Series:
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.rows = 0
+        self.bytes = 0
+        self.seconds = 0.0
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+
+    def observe(self, seconds, rows, size, error):
+        self.calls += 1
+        self.errors += int(error)
+        self.rows += rows
+        self.bytes += size
+        self.seconds += seconds
+        self.buckets[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+
+    def quantile(self, q):
+        """
+        Estimate a latency quantile as the upper bound of the bucket that contains it.
+        """
+        target = q * self.calls
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS, self.buckets):
+            seen += count
+            if count and seen >= target:
+                return bound
+        return 0.0
+
+
+class MetricsRegistry:
+    """
+    Call counts, error counts, rows, bytes and latency histograms per (kind, name).
+    kind is "query" for repository statements and "vendor" for vendor API requests.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def observe(self, kind, name, seconds, rows=0, size=0, error=False):
+        with self._lock:
+            self._series.setdefault((kind, name), Series()).observe(seconds, rows, size, error)
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    def summary(self):
+        """
+        Return one dict per series, sorted by total time spent.
+        """
+        with self._lock:
+            rows = [{
+                "Kind": kind,
+                "Name": name,
+                "Calls": series.calls,
+                "Errors": series.errors,
+                "Rows": series.rows,
+                "Bytes": series.bytes,
+                "Total (s)": round(series.seconds, 4),
+                "p50 (s)": series.quantile(0.5),
+                "p95 (s)": series.quantile(0.95),
+            } for (kind, name), series in self._series.items()]
+        return sorted(rows, key=lambda row: row["Total (s)"], reverse=True)
+
+    def to_text(self, prefix="back_office"):
+        """
+        Render the registry in the Prometheus text exposition format.
+        """
+        lines = [
+            f"# TYPE {prefix}_call_duration_seconds histogram",
+            f"# TYPE {prefix}_calls_total counter",
+            f"# TYPE {prefix}_call_errors_total counter",
+            f"# TYPE {prefix}_rows_total counter",
+            f"# TYPE {prefix}_bytes_total counter",
+        ]
+        with self._lock:
+            for (kind, name), series in sorted(self._series.items()):
+                labels = f'kind="{kind}",name="{name}"'
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS, series.buckets):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f'{prefix}_call_duration_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+                lines.append(f"{prefix}_call_duration_seconds_sum{{{labels}}} {series.seconds}")
+                lines.append(f"{prefix}_call_duration_seconds_count{{{labels}}} {series.calls}")
+                lines.append(f"{prefix}_calls_total{{{labels}}} {series.calls}")
+                lines.append(f"{prefix}_call_errors_total{{{labels}}} {series.errors}")
+                lines.append(f"{prefix}_rows_total{{{labels}}} {series.rows}")
+                lines.append(f"{prefix}_bytes_total{{{labels}}} {series.bytes}")
+        return "\n".join(lines) + "\n"
+
+
+# Everything observed by this process
+process_metrics = MetricsRegistry()
+
+# The registry of the run (page submit, batch job) the current code belongs to
+_current_run = contextvars.ContextVar("current_run", default=None)
+
+
+def start_run():
+    """
+    Start collecting metrics for a new run in the current context and return its registry.
+    """
+    registry = MetricsRegistry()
+    _current_run.set(registry)
+    return registry
+
+
+def current_run():
+    return _current_run.get()
+
+
+def bind_context(fn):
+    """
+    Wrap fn so calls made on worker threads are recorded in the caller's run.
+    """
+    context = contextvars.copy_context()
+
+    def wrapper(*args, **kwargs):
+        return context.copy().run(fn, *args, **kwargs)
+    return wrapper
+
+
+class Measurement:
+
+    def __init__(self):
+        self.rows = 0
+        self.bytes = 0
+        self.error = False
+
+
+@contextmanager
+def track(kind, name):
+    """
+    Time the with block and record it for the process and the current run.
+    Set rows, bytes or error on the yielded Measurement; an exception counts as an error.
+    """
+    measurement = Measurement()
+    started = time.perf_counter()
+    try:
+        yield measurement
+    except Exception:
+        measurement.error = True
+        raise
+    finally:
+        seconds = time.perf_counter() - started
+        process_metrics.observe(kind, name, seconds, measurement.rows, measurement.bytes, measurement.error)
+        run = _current_run.get()
+        if run is not None:
+            run.observe(kind, name, seconds, measurement.rows, measurement.bytes, measurement.error)
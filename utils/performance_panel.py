@@ -0,0 +1,25 @@
+import pandas as pd
+import streamlit as st
+from utils.metrics import process_metrics
+
+
+def render_performance_panel(run_metrics):
+    """
+    Show the metrics of the current run in the sidebar, with a metrics text download.
+    """
+    if not st.sidebar.checkbox("Show performance panel"):
+        return
+
+    st.sidebar.subheader("Performance")
+    summary = run_metrics.summary()
+    if not summary:
+        st.sidebar.write("No queries or vendor calls in this run.")
+    else:
+        df = pd.DataFrame(summary)
+        totals = df.groupby("Kind")["Total (s)"].sum().round(3)
+        for kind, seconds in totals.items():
+            st.sidebar.write(f"{kind}: {seconds}s over {int(df.loc[df['Kind'] == kind, 'Calls'].sum())} calls")
+        st.sidebar.dataframe(df, use_container_width=True)
+
+    st.sidebar.download_button("Download run metrics", run_metrics.to_text(), file_name="run_metrics.txt")
+    st.sidebar.download_button("Download process metrics", process_metrics.to_text(), file_name="process_metrics.txt")
@@ -0,0 +1,154 @@
+import io
+import re
+import ast
+import json
+import codecs
+
+
+WHITESPACE = re.compile(r"\s*")
+
+
+class ReportReader:
+    """
+    Reads a JSON report object such as {"Table Name": ..., "Data": [...]} incrementally.
+    The rows of array_key are yielded in batches and the other top-level fields are
+    collected in fields, so neither the text nor the full row list is held in memory.
+    Input that is a Python literal rather than JSON (e.g. single-quoted keys) is parsed
+    with ast.literal_eval instead; nothing is ever evaluated as code.
+    """
+
+    READ_SIZE = 65536
+
+    def __init__(self, source, array_key="Data", batch_size=5000):
+        if isinstance(source, str):
+            source = io.StringIO(source)
+        elif isinstance(source, (bytes, bytearray)):
+            source = io.BytesIO(source)
+        self.source = source
+        self.array_key = array_key
+        self.batch_size = batch_size
+        self.fields = {}
+        self._decoder = json.JSONDecoder()
+        self._text_decoder = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+        self._yielded = False
+
+    def batches(self):
+        """
+        Yield the rows of array_key as lists of at most batch_size items.
+        Raises ValueError when the input is neither a JSON nor a Python literal object,
+        or when its array_key value is not a list.
+        """
+        try:
+            yield from self._json_batches()
+        except json.JSONDecodeError as error:
+            if self._yielded or not hasattr(self.source, "seek"):
+                raise ValueError(f"Invalid JSON input: {error}")
+            yield from self._literal_batches()
+
+    def _read(self):
+        """
+        Append the next block of the source to the buffer; return False at the end of the input.
+        """
+        if self._eof:
+            return False
+        chunk = self.source.read(self.READ_SIZE)
+        if not chunk:
+            self._eof = True
+        if isinstance(chunk, bytes):
+            chunk = self._text_decoder.decode(chunk, final=self._eof)
+        self._buffer = self._buffer[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def _peek(self):
+        """
+        Skip whitespace and return the next character, or "" at the end of the input.
+        """
+        while True:
+            self._pos = WHITESPACE.match(self._buffer, self._pos).end()
+            if self._pos < len(self._buffer) or not self._read():
+                return self._buffer[self._pos:self._pos + 1]
+
+    def _expect(self, characters):
+        character = self._peek()
+        if not character or character not in characters:
+            raise json.JSONDecodeError(f"Expecting one of {characters!r}", self._buffer, self._pos)
+        self._pos += 1
+        return character
+
+    def _value(self):
+        """
+        Decode the next JSON value, reading more input while it is incomplete. A value that
+        ends exactly at the end of the buffer is decoded again after the next read, so a
+        number split between two reads is not cut short.
+        """
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+                if end < len(self._buffer) or self._eof:
+                    self._pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+            self._read()
+
+    def _json_batches(self):
+        self._expect("{")
+        if self._peek() == "}":
+            return
+        while True:
+            key = self._value()
+            self._expect(":")
+            if key == self.array_key:
+                yield from self._array_batches()
+            else:
+                self.fields[key] = self._value()
+            if self._expect(",}") == "}":
+                return
+
+    def _array_batches(self):
+        if self._peek() != "[":
+            raise ValueError(self._not_a_list())
+        self._pos += 1
+        if self._peek() == "]":
+            self._pos += 1
+            return
+        batch = []
+        while True:
+            batch.append(self._value())
+            if len(batch) >= self.batch_size:
+                self._yielded = True
+                yield batch
+                batch = []
+            if self._expect(",]") == "]":
+                break
+        if batch:
+            self._yielded = True
+            yield batch
+
+    def _not_a_list(self):
+        return f"Invalid JSON input: {self.array_key!r} must be a list."
+
+    def _literal_batches(self):
+        self.source.seek(0)
+        text = self.source.read()
+        if isinstance(text, bytes):
+            text = text.decode("utf-8")
+        try:
+            document = ast.literal_eval(text)
+        except (ValueError, SyntaxError) as error:
+            raise ValueError(f"Invalid JSON input: {error}")
+        if not isinstance(document, dict):
+            raise ValueError("Invalid JSON input: expected an object.")
+
+        rows = document.pop(self.array_key, [])
+        if not isinstance(rows, list):
+            raise ValueError(self._not_a_list())
+        self.fields = document
+        for start in range(0, len(rows), self.batch_size):
+            yield rows[start:start + self.batch_size]
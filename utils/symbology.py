@@ -0,0 +1,121 @@
+import re
+import time
+import hashlib
+import threading
+import pandas as pd
+from utils.mapping import ticker_mapping
+
+
+class TickerResolver:
+    """
+    Resolves custodian security ids to the ticker ids used in eod_prices.
+    A mapped id is replaced by its target, then '_', '-' and ' ' become '.',
+    except for targets listed in exempt which are used as they are.
+    mapping_error is set by get_resolver when the database mappings could not be loaded.
+    """
+
+    EXEMPT_TICKERS = ("BRK-B.US",)
+    SEPARATOR_CHARACTERS = "_- "
+    SEPARATORS = f"[{re.escape(SEPARATOR_CHARACTERS)}]"
+
+    def __init__(self, mapping, exempt=EXEMPT_TICKERS):
+        self.mapping = dict(mapping)
+        self.exempt = frozenset(exempt)
+        self.version = hashlib.sha1(repr(sorted(self.mapping.items())).encode()).hexdigest()[:12]
+        self._memo = {}
+        self._lock = threading.Lock()
+        self.mapping_error = None
+
+    def resolve(self, security_ids):
+        """
+        Resolve a pandas Series of security ids in one vectorized pass.
+        Ids resolved before by this resolver are served from its memo.
+        """
+        security_ids = pd.Series(security_ids)
+        with self._lock:
+            unseen = pd.Series(security_ids.dropna().unique())
+            unseen = unseen[~unseen.isin(self._memo.keys())]
+            if not unseen.empty:
+                targets = unseen.map(self.mapping).fillna(unseen)
+                resolved = targets.where(targets.isin(self.exempt), targets.str.replace(self.SEPARATORS, ".", regex=True))
+                self._memo.update(zip(unseen, resolved))
+            return security_ids.map(self._memo)
+
+    def resolve_one(self, security_id):
+        """
+        Resolve a single security id.
+        """
+        return self.resolve(pd.Series([security_id])).iloc[0]
+
+    def report(self, security_ids):
+        """
+        Return a DataFrame of security ids whose mapping target is empty and of ids
+        that have no mapping and are only resolved by replacing separators.
+        """
+        security_ids = pd.Series(pd.Series(security_ids).dropna().unique())
+        targets = security_ids.map(self.mapping)
+        issues = pd.Series(None, index=security_ids.index, dtype=object)
+        issues[targets.isna()] = "Unmapped"
+        issues[targets == ""] = "Empty mapping target"
+        report = pd.DataFrame({"Security ID": security_ids, "Issue": issues})
+        return report.dropna().reset_index(drop=True)
+
+    @classmethod
+    def sql_expression(cls, target):
+        """
+        Return a SQL expression that resolves the already mapped ticker expression target the
+        same way resolve does, built from EXEMPT_TICKERS and SEPARATOR_CHARACTERS.
+        """
+        def literal(value):
+            return "'" + value.replace("'", "''") + "'"
+
+        separators = cls.SEPARATOR_CHARACTERS
+        return (
+            f"CASE WHEN {target} IN ({', '.join(literal(ticker) for ticker in cls.EXEMPT_TICKERS)}) THEN {target} "
+            f"ELSE translate({target}, {literal(separators)}, {literal('.' * len(separators))}) END"
+        )
+
+
+_resolver = None
+_resolver_loaded_at = 0
+_resolver_lock = threading.Lock()
+
+
+def get_resolver(ticker_mappings=None, max_age=300):
+    """
+    Return the process-wide TickerResolver.
+    With a TickerMappings table, database mappings are layered over utils.mapping
+    and reloaded after max_age seconds; the resolver and its memo are only replaced
+    when the mapping version changes. When the database mappings cannot be loaded, the
+    resolver uses utils.mapping alone and carries the failure in mapping_error.
+    """
+    global _resolver, _resolver_loaded_at
+    with _resolver_lock:
+        now = time.monotonic()
+        if _resolver is not None and (ticker_mappings is None or now - _resolver_loaded_at < max_age):
+            return _resolver
+
+        mapping = dict(ticker_mapping)
+        mapping_error = None
+        if ticker_mappings is not None:
+            try:
+                mapping.update(ticker_mappings.get_records())
+            except Exception as error:
+                mapping_error = f"Unable to load ticker mappings from the database, using the built-in mapping. Error: {error}"
+
+        resolver = TickerResolver(mapping)
+        if _resolver is None or resolver.version != _resolver.version:
+            _resolver = resolver
+        _resolver.mapping_error = mapping_error
+        _resolver_loaded_at = now
+        return _resolver
+
+
+def reset_resolver():
+    """
+    Forget the process-wide TickerResolver, so the next get_resolver call loads the mappings again.
+    """
+    global _resolver, _resolver_loaded_at
+    with _resolver_lock:
+        _resolver = None
+        _resolver_loaded_at = 0